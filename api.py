@@ -0,0 +1,308 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import hashlib
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, current_app, request
+from sqlalchemy import func
+
+import areas
+import autocomplete
+import calendars
+import clock
+import facets
+import queries
+import scheduling
+from models import db, Venue, Artist, Show, ShowChange
+from routing import read_only
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# ----------------------------------------------------------------------------#
+# Helpers.
+# ----------------------------------------------------------------------------#
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json(payload, status=200):
+    body = json.dumps(payload, separators=(",", ":"), default=_default)
+    return Response(body, status=status, mimetype="application/json")
+
+
+def _version(*aggregates):
+    # Runs every single-value aggregate as a scalar subquery of one SELECT,
+    # so working out whether anything changed costs one round trip.
+    return db.session.query(*[q.scalar_subquery() for q in aggregates]).one()
+
+
+def _table_version(model, *criteria):
+    return (
+        db.session.query(func.max(model.updated_at)).filter(*criteria),
+        db.session.query(func.count(model.id)).filter(*criteria),
+    )
+
+
+def _upcoming_count(*criteria):
+    return db.session.query(func.count(Show.id)).filter(
+        Show.start_time > clock.now(), *criteria
+    )
+
+
+def conditional(version, build, render=_json):
+    # Answers with 304 when the client already holds the representation for
+    # `version`, and only calls `build` to assemble the body otherwise (and
+    # `render` to turn it into a response). The request path and query
+    # string are part of the ETag so each page of a listing is validated
+    # separately. There is no Last-Modified: deletes and counts that roll
+    # over change the body without moving any updated_at, so only the ETag
+    # can tell.
+    etag = hashlib.sha1(repr((request.full_path, tuple(version))).encode()).hexdigest()
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        payload = build()
+        if payload is None:
+            abort(404)
+        response = render(payload)
+
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def load_page(listing):
+    try:
+        return queries.load_page(listing, request.args, current_app.config)
+    except ValueError:
+        abort(400)
+
+
+def _page_payload(page, key):
+    return {
+        key: page.items,
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    }
+
+
+def listing_page(listing, key):
+    # A listing page is one keyset range scan, cheaper than any version of
+    # the tables behind it, so the page is read and is its own version: a
+    # 304 saves rendering and transfer, and cannot miss a delete, a counter
+    # that rolled over or a refresh of the venue_areas view.
+    payload = _page_payload(load_page(listing), key)
+    return conditional((payload,), lambda: payload)
+
+
+def discover(model, key):
+    # Rows matching the ?genre=, ?state=, ?city= and ?seeking= filters, a
+    # page at a time, with the facet counts of all the matches. Not
+    # conditional: the whole-table version would cost more than the
+    # filtered queries themselves.
+    try:
+        filters = facets.parse_filters(request.args)
+    except ValueError:
+        abort(400)
+    payload = _page_payload(load_page(facets.listing(model, filters)), key)
+    payload["total"], payload["facets"] = facets.facet_counts(
+        model, filters, current_app.config["FACET_LIMIT"]
+    )
+    return _json(payload)
+
+
+def complete(model):
+    # ?q=<name prefix>&limit=; ids and names for typeahead fields.
+    config = current_app.config
+    limit = request.args.get("limit", config["AUTOCOMPLETE_LIMIT"], type=int)
+    limit = max(1, min(limit, config["AUTOCOMPLETE_MAX_LIMIT"]))
+    prefix = request.args.get("q", "").lstrip()
+    return _json({"data": autocomplete.complete(model, prefix, limit)})
+
+
+# ----------------------------------------------------------------------------#
+# Venues.
+# ----------------------------------------------------------------------------#
+
+
+@api.route("/venues")
+@read_only
+def venues():
+    return listing_page(areas.venue_areas, "areas")
+
+
+@api.route("/venues/discover")
+@read_only
+def discover_venues():
+    return discover(Venue, "venues")
+
+
+@api.route("/venues/autocomplete")
+@read_only
+def complete_venues():
+    return complete(Venue)
+
+
+@api.route("/venues/<int:venue_id>")
+@read_only
+def show_venue(venue_id):
+    version = _version(
+        db.session.query(Venue.updated_at).filter(Venue.id == venue_id),
+        *_table_version(Show, Show.venue_id == venue_id),
+        _upcoming_count(Show.venue_id == venue_id),
+        db.session.query(func.max(Artist.updated_at))
+        .join(Show, Show.artist_id == Artist.id)
+        .filter(Show.venue_id == venue_id),
+    )
+    if version[0] is None:
+        abort(404)
+    return conditional(version, lambda: queries.venue_detail(venue_id))
+
+
+# ----------------------------------------------------------------------------#
+# Artists.
+# ----------------------------------------------------------------------------#
+
+
+@api.route("/artists")
+@read_only
+def artists():
+    return listing_page(queries.artist_listing, "artists")
+
+
+@api.route("/artists/discover")
+@read_only
+def discover_artists():
+    return discover(Artist, "artists")
+
+
+@api.route("/artists/autocomplete")
+@read_only
+def complete_artists():
+    return complete(Artist)
+
+
+@api.route("/artists/<int:artist_id>")
+@read_only
+def show_artist(artist_id):
+    version = _version(
+        db.session.query(Artist.updated_at).filter(Artist.id == artist_id),
+        *_table_version(Show, Show.artist_id == artist_id),
+        _upcoming_count(Show.artist_id == artist_id),
+        db.session.query(func.max(Venue.updated_at))
+        .join(Show, Show.venue_id == Venue.id)
+        .filter(Show.artist_id == artist_id),
+    )
+    if version[0] is None:
+        abort(404)
+    return conditional(version, lambda: queries.artist_detail(artist_id))
+
+
+# ----------------------------------------------------------------------------#
+# Shows.
+# ----------------------------------------------------------------------------#
+
+
+@api.route("/shows")
+@read_only
+def shows():
+    return listing_page(queries.show_listing, "shows")
+
+
+@api.route("/shows/batch", methods=["POST"])
+def schedule_shows():
+    # Books {"shows": [{"artist_id", "venue_id", "start_time", "end_time"?},
+    # ...]} all together or not at all. 201 with the new ids in request
+    # order, or 422 with the errors of each rejected show by its index.
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("shows"), list):
+        abort(400)
+    items = payload["shows"]
+    if len(items) > current_app.config["SHOW_BATCH_MAX"]:
+        abort(413)
+
+    ids, errors = scheduling.schedule(items)
+    if errors:
+        return _json({"errors": errors}, status=422)
+    page_cache = current_app.extensions["page_cache"]
+    page_cache.invalidate("venue", *{item["venue_id"] for item in items})
+    page_cache.invalidate("artist", *{item["artist_id"] for item in items})
+    return _json({"ids": ids}, status=201)
+
+
+# ----------------------------------------------------------------------------#
+# Calendar.
+# ----------------------------------------------------------------------------#
+
+
+def _calendar_args():
+    try:
+        start, end = calendars.parse_range(request.args, current_app.config)
+        filters = calendars.parse_filters(request.args)
+    except ValueError:
+        abort(400)
+    return start, end, filters
+
+
+def _calendar_version(start, end):
+    # Any committed show change moves the snapshot xmin or the newest
+    # change id. Writes to other tables move xmin too; they only cost an
+    # unneeded rebuild.
+    return (
+        *_version(
+            db.session.query(calendars.snapshot_xmin),
+            db.session.query(func.max(ShowChange.id)),
+        ),
+        start,
+        end,
+    )
+
+
+@api.route("/calendar")
+@read_only
+def calendar():
+    # Shows starting between ?start= and ?end=, optionally for one
+    # ?venue_id=, ?artist_id= or ?city=, with a cursor. Sending the cursor
+    # back as ?since= (with the same range and filters) returns only the
+    # shows changed since, and the ids of those that left the view: 410
+    # once it is older than CALENDAR_SYNC_RETENTION_DAYS.
+    start, end, filters = _calendar_args()
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            since = calendars.parse_cursor(since, current_app.config)
+        except calendars.CursorExpired:
+            abort(410)
+        except ValueError:
+            abort(400)
+        return _json(calendars.changes(start, end, filters, since))
+
+    version = _calendar_version(start, end)
+    return conditional(
+        version,
+        lambda: {
+            "shows": calendars.entries(start, end, filters),
+            "cursor": calendars.cursor(version[0]),
+        },
+    )
+
+
+@api.route("/calendar.ics")
+@read_only
+def calendar_ics():
+    # The same shows as /calendar, for calendar apps to subscribe to.
+    start, end, filters = _calendar_args()
+    return conditional(
+        _calendar_version(start, end),
+        lambda: calendars.entries(start, end, filters),
+        lambda shows: Response(
+            calendars.to_ical(shows, request.host), mimetype="text/calendar"
+        ),
+    )
@@ -2,16 +2,44 @@
 # Imports
 # ----------------------------------------------------------------------------#
 import json
+import functools
+import click
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+from flask import (
+    Flask,
+    render_template,
+    request,
+    Response,
+    flash,
+    redirect,
+    url_for,
+    abort,
+    stream_with_context,
+)
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
+from models import db, Venue, Artist
+import queries
+import search
+import counters
+import areas
+import calendars
+import importer
+import exporter
+import jobs
+import scheduling
+import pool
+from cache import PageCache, FragmentCache
+from api import api
+from instrumentation import Instrumentation
+from responses import HttpCaching, cache_policy
+from routing import on_primary, read_only
 
 # ----------------------------------------------------------------------------#
 # App Config.
@@ -20,80 +48,51 @@ from forms import *
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object("config")
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = pool.engine_options(app.config)
 
-db = SQLAlchemy(app)
+db.init_app(app)
 
 migrate = Migrate(app, db)
 
-# ----------------------------------------------------------------------------#
-# Models.
-# ----------------------------------------------------------------------------#
+instrumentation = Instrumentation(app)
 
+# Registered after Instrumentation so its after_request hook, which runs
+# first, compresses and stores the response before Server-Timing is added.
+http_caching = HttpCaching(app)
 
-class Show(db.Model):
-    __tablename__ = "shows"
-
-    id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.ForeignKey("venues.id"))
-    artist_id = db.Column(db.ForeignKey("artists.id"))
-    start_time = db.Column(db.DateTime(), nullable=False)
-
-
-class Venue(db.Model):
-    __tablename__ = "venues"
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    address = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120), nullable=False)
-    image_link = db.Column(db.String(500))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
-    facebook_link = db.Column(db.String(120))
-    website = db.Column(db.String(120))
-    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
-    seeking_description = db.Column(db.String(120))
-    shows = db.relationship(
-        "Show",
-        backref="venue",
-        cascade="all, delete-orphan",
-    )
-
+page_cache = PageCache.from_config(app.config)
+page_cache.init_app(app)
 
-class Artist(db.Model):
-    __tablename__ = "artists"
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120), nullable=False)
-    image_link = db.Column(db.String(500))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
-    facebook_link = db.Column(db.String(120))
-    website = db.Column(db.String(120))
-    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
-    seeking_description = db.Column(db.String(120))
-    shows = db.relationship(
-        "Show",
-        backref="artist",
-        cascade="all, delete-orphan",
-    )
+fragment_cache = FragmentCache.from_config(app.config)
+fragment_cache.init_app(app)
 
+app.register_blueprint(api)
 
 # ----------------------------------------------------------------------------#
 # Filters.
 # ----------------------------------------------------------------------------#
 
 
+DATETIME_PATTERNS = {
+    "full": babel.dates.parse_pattern("EEEE MMMM, d, y 'at' h:mma"),
+    "medium": babel.dates.parse_pattern("EE MM, dd, y h:mma"),
+}
+DATETIME_LOCALE = babel.Locale.parse("en")
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_datetime(date, format):
+    pattern = DATETIME_PATTERNS.get(format)
+    if pattern is None:
+        return babel.dates.format_datetime(date, format, locale=DATETIME_LOCALE)
+    return pattern.apply(date, DATETIME_LOCALE)
+
+
 def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale="en")
+    # Views pass datetimes; strings are still accepted for older callers.
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    return _format_datetime(value, format)
 
 
 app.jinja_env.filters["datetime"] = format_datetime
@@ -104,7 +103,15 @@ app.jinja_env.filters["datetime"] = format_datetime
 # ----------------------------------------------------------------------------#
 
 
+def load_page(listing):
+    try:
+        return queries.load_page(listing, request.args, app.config)
+    except ValueError:
+        abort(400)
+
+
 @app.route("/")
+@cache_policy(public=True, max_age=300)
 def index():
     return render_template("pages/home.html")
 
@@ -114,82 +121,21 @@ def index():
 
 
 @app.route("/venues")
+@read_only
+@cache_policy(public=True, max_age=0, s_maxage=30)
 def venues():
-    # TODO: replace with real venues data.
-    #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-    # venues = Venue.query.order_by(Venue.state).all()
-    city_and_state = Venue.query.distinct(Venue.state, Venue.city).all()
-    data = []
-    for city in city_and_state:
-        city_details = {"state": city.state, "city": city.city}
-
-        # Fetch Venues for each distinct city
-        venues = Venue.query.filter_by(state=city.state, city=city.city).all()
-        venues_data = []
-        for venue in venues:
-            current_time = datetime.now()
-            upcoming_shows = len(
-                list(filter(lambda s: s.start_time > current_time, venue.shows))
-            )
-
-            venue_dict = {
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": upcoming_shows,
-            }
-            venues_data.append(venue_dict)
-        city_details["venues"] = venues_data
-        data.append(city_details)
-
-    return render_template("pages/venues.html", areas=data)
+    page = load_page(areas.venue_areas)
+    return render_template("pages/venues.html", areas=page.items, page=page)
 
 
 @app.route("/venues/<int:venue_id>")
+@read_only
+@cache_policy(public=True, max_age=0, s_maxage=30)
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
-    venue = Venue.query.get(venue_id)
-
-    # Upcoming Shows logic
-    upcoming_shows_query = (
-        db.session.query(Show)
-        .join(Venue)
-        .filter(Show.venue_id == venue_id)
-        .filter(Show.start_time > datetime.now())
-        .all()
-    )
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        details = {
-            "artist_id": show.artist.id,
-            "artist_name": show.artist.name,
-            "artist_image_link": show.artist.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
-        }
-        upcoming_shows.append(details)
-
-    # Past Shows logic
-    past_shows_query = (
-        db.session.query(Show)
-        .join(Venue)
-        .filter(Show.venue_id == venue_id)
-        .filter(Show.start_time < datetime.now())
-        .all()
-    )
-    past_shows = []
-    for show in past_shows_query:
-        details = {
-            "artist_id": show.artist.id,
-            "artist_name": show.artist.name,
-            "artist_image_link": show.artist.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
-        }
-        past_shows.append(details)
-
-    venue.upcoming_shows_count = len(upcoming_shows)
-    venue.upcoming_shows = upcoming_shows
-    venue.past_shows_count = len(past_shows)
-    venue.past_shows = past_shows
-
+    venue = page_cache.get_or_load("venue", venue_id, on_primary(queries.venue_detail))
+    if venue is None:
+        abort(404)
     return render_template("pages/show_venue.html", venue=venue)
 
 
@@ -197,22 +143,17 @@ def show_venue(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues/search", methods=["POST"])
+@app.route("/venues/search", methods=["GET", "POST"])
+@read_only
 def search_venues():
-    search_term = request.form["search_term"]
-    query = Venue.query.filter(Venue.name.ilike(f"%{search_term}%")).all()
-
-    response = {"count": "", "data": []}
-
-    response["count"] = len(query)
-    for venue in query:
-        venue_details = {"id": venue.id, "name": venue.name}
-        response["data"].append(venue_details)
+    search_term = request.values.get("search_term", "")
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    response = search.search_venues(search_term, app.config["SEARCH_PAGE_SIZE"], offset)
 
     return render_template(
         "pages/search_venues.html",
         results=response,
-        search_term=request.form.get("search_term", ""),
+        search_term=search_term,
     )
 
 
@@ -247,6 +188,7 @@ def create_venue_submission():
 
         db.session.add(venue)
         db.session.commit()
+        areas.changed()
         flash("Venue " + request.form["name"] + " was successfully listed!")
     else:
         db.session.rollback()
@@ -266,8 +208,12 @@ def create_venue_submission():
 def delete_venue(venue_id):
     try:
         venue = Venue.query.get(venue_id)
+        artist_ids = queries.artist_ids_for_venue(venue_id)
         db.session.delete(venue)
         db.session.commit()
+        page_cache.invalidate("venue", venue_id)
+        page_cache.invalidate("artist", *artist_ids)
+        areas.changed()
         flash("Venue was successfully deleted!")
     except:
         db.session.rollback()
@@ -284,7 +230,7 @@ def delete_venue(venue_id):
 def edit_venue(venue_id):
     form = VenueForm()
     venue = Venue.query.get(venue_id)
-    form.genres.data = venue.genres.getlist("genres")
+    form.genres.data = venue.genres
     return render_template("forms/edit_venue.html", form=form, venue=venue)
 
 
@@ -306,6 +252,9 @@ def edit_venue_submission(venue_id):
         venue.seeking_description = form.seeking_description.data
         db.session.add(venue)
         db.session.commit()
+        page_cache.invalidate("venue", venue_id)
+        page_cache.invalidate("artist", *queries.artist_ids_for_venue(venue_id))
+        areas.changed()
         flash("Venue edited successfully")
     else:
         db.session.rollback()
@@ -324,56 +273,23 @@ def edit_venue_submission(venue_id):
 
 
 @app.route("/artists")
+@read_only
+@cache_policy(public=True, max_age=0, s_maxage=30)
 def artists():
-    data = Artist.query.all()
-    return render_template("pages/artists.html", artists=data)
+    page = load_page(queries.artist_listing)
+    return render_template("pages/artists.html", artists=page.items, page=page)
 
 
 @app.route("/artists/<int:artist_id>")
+@read_only
+@cache_policy(public=True, max_age=0, s_maxage=30)
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
-    artist = Artist.query.get(artist_id)
-
-    # Upcoming Shows logic
-    upcoming_shows_query = (
-        db.session.query(Show)
-        .join(Venue)
-        .filter(Show.artist_id == artist_id)
-        .filter(Show.start_time > datetime.now())
-        .all()
-    )
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        details = {
-            "venue_id": show.venue_id,
-            "venue_name": show.venue.name,
-            "venue_image_link": show.venue.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
-        }
-        upcoming_shows.append(details)
-
-    # Past Shows logic
-    past_shows_query = (
-        db.session.query(Show)
-        .join(Venue)
-        .filter(Show.artist_id == artist_id)
-        .filter(Show.start_time < datetime.now())
-        .all()
+    artist = page_cache.get_or_load(
+        "artist", artist_id, on_primary(queries.artist_detail)
     )
-    past_shows = []
-    for show in past_shows_query:
-        details = {
-            "venue_name": show.venue.name,
-            "venue_id": show.venue.id,
-            "venue_image_link": show.venue.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
-        }
-        past_shows.append(details)
-
-    artist.upcoming_shows_count = len(upcoming_shows)
-    artist.upcoming_shows = upcoming_shows
-    artist.past_shows_count = len(past_shows)
-    artist.past_shows = past_shows
+    if artist is None:
+        abort(404)
     return render_template("pages/show_artist.html", artist=artist)
 
 
@@ -381,22 +297,19 @@ def show_artist(artist_id):
 #  ----------------------------------------------------------------
 
 
-@app.route("/artists/search", methods=["POST"])
+@app.route("/artists/search", methods=["GET", "POST"])
+@read_only
 def search_artists():
-    search_term = request.form["search_term"]
-    query_results = Artist.query.filter(Artist.name.ilike(f"%{search_term}%")).all()
-
-    response = {"count": "", "data": []}
-
-    response["count"] = len(query_results)
-    for artist in query_results:
-        artist_details = {"id": artist.id, "name": artist.name}
-        response["data"].append(artist_details)
+    search_term = request.values.get("search_term", "")
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    response = search.search_artists(
+        search_term, app.config["SEARCH_PAGE_SIZE"], offset
+    )
 
     return render_template(
         "pages/search_artists.html",
         results=response,
-        search_term=request.form.get("search_term", ""),
+        search_term=search_term,
     )
 
 
@@ -449,6 +362,7 @@ def create_artist_submission():
 def edit_artist(artist_id):
     form = ArtistForm()
     artist = Artist.query.get(artist_id)
+    form.genres.data = artist.genres
     return render_template("forms/edit_artist.html", form=form, artist=artist)
 
 
@@ -471,6 +385,8 @@ def edit_artist_submission(artist_id):
 
         db.session.add(artist)
         db.session.commit()
+        page_cache.invalidate("artist", artist_id)
+        page_cache.invalidate("venue", *queries.venue_ids_for_artist(artist_id))
         flash("Artist " + request.form["name"] + " was successfully edited!")
     else:
         db.session.rollback()
@@ -488,21 +404,12 @@ def edit_artist_submission(artist_id):
 
 
 @app.route("/shows")
+@read_only
+@cache_policy(public=True, max_age=0, s_maxage=30)
 def shows():
     # displays list of shows at /shows
-    shows = Show.query.all()
-    data = []
-    for show in shows:
-        info = {
-            "venue_id": show.venue_id,
-            "venue_name": show.venue.name,
-            "artist_id": show.artist_id,
-            "artist_name": show.artist.name,
-            "artist_image_link": show.artist.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
-        }
-        data.append(info)
-    return render_template("pages/shows.html", shows=data)
+    page = load_page(queries.show_listing)
+    return render_template("pages/shows.html", shows=page.items, page=page)
 
 
 #  Create Show
@@ -521,21 +428,70 @@ def create_show_submission():
     # called to create new shows in the db, upon submitting new show listing form
     form = ShowForm(request.form)
     if form.validate():
-        show = Show(
-            artist_id=form.artist_id.data,
-            venue_id=form.venue_id.data,
-            start_time=form.start_time.data,
+        # The same checks as the batch API: both ids exist and neither the
+        # venue nor the artist is booked at that time.
+        _, errors = scheduling.schedule(
+            [
+                {
+                    "artist_id": form.artist_id.data,
+                    "venue_id": form.venue_id.data,
+                    "start_time": form.start_time.data,
+                }
+            ]
         )
-        db.session.add(show)
-        db.session.commit()
-        flash("Show was successfully listed!")
-    else:
-        db.session.rollback()
-        flash("An error occurred. Show could not be listed.")
-        db.session.close()
+        if not errors:
+            page_cache.invalidate("venue", form.venue_id.data)
+            page_cache.invalidate("artist", form.artist_id.data)
+            flash("Show was successfully listed!")
+            return render_template("pages/home.html")
+        for field, message in errors[0]["errors"].items():
+            flash(f"{field} - {message}")
+    db.session.rollback()
+    flash("An error occurred. Show could not be listed.")
+    db.session.close()
     return render_template("pages/home.html")
 
 
+#  Metrics
+#  ----------------------------------------------------------------
+
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus text format: connection pool checkout waits and
+    # saturation, detail page cache hits and misses, and template fragment
+    # cache hits with the render time they saved, shared response cache
+    # hits and compressed bytes.
+    lines = []
+    for index, stats in enumerate(pool.pool_stats()):
+        for name, value in stats.items():
+            lines.append(f'fyyur_db_pool_{name}{{pool="{index}"}} {value}')
+    for name, value in page_cache.stats().items():
+        lines.append(f"fyyur_page_cache_{name} {value}")
+    for name, value in fragment_cache.stats().items():
+        lines.append(f"fyyur_fragment_cache_{name} {value}")
+    for name, value in http_caching.stats().items():
+        lines.append(f"fyyur_http_{name} {value}")
+    return Response("\n".join(lines) + "\n", mimetype="text/plain")
+
+
+#  Export
+#  ----------------------------------------------------------------
+
+
+@app.route("/export/<kind>.<format>")
+@read_only
+def export_data(kind, format):
+    if kind not in exporter.EXPORTS or format not in exporter.FORMATS:
+        abort(404)
+    response = Response(
+        stream_with_context(exporter.export_rows(kind, format)),
+        mimetype=exporter.FORMATS[format],
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename={kind}.{format}"
+    return response
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
@@ -546,6 +502,110 @@ def server_error(error):
     return render_template("errors/500.html"), 500
 
 
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+
+@app.cli.command("import-data")
+@click.argument("kind", type=click.Choice(sorted(importer.IMPORTERS)))
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "format", type=click.Choice(["csv", "ndjson"]), default=None)
+@click.option("--batch-size", default=5000, show_default=True)
+@click.option("--copy/--no-copy", "use_copy", default=False, help="Load with COPY.")
+def import_data(kind, source, format, batch_size, use_copy):
+    """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+    if format is None:
+        format = "ndjson" if source.name.endswith((".ndjson", ".jsonl")) else "csv"
+
+    def progress(loaded, failed, elapsed):
+        rate = loaded / elapsed if elapsed else 0
+        click.echo(f"{kind}: {loaded} loaded, {failed} rejected ({rate:.0f} rows/s)")
+
+    loaded, errors, elapsed = importer.import_rows(
+        kind,
+        importer.read_rows(source, format),
+        batch_size=batch_size,
+        use_copy=use_copy,
+        progress=progress,
+    )
+    for line_no, message in sorted(errors):
+        click.echo(f"line {line_no}: {message}", err=True)
+    if kind == "shows" and app.config["PAGE_CACHE_BACKEND"] == "redis":
+        # Only a shared store can be cleared from this process; the
+        # server's in-process caches catch up within PAGE_CACHE_TTL.
+        page_cache.clear()
+    if kind in ("venues", "shows"):
+        areas.changed()
+
+    rate = loaded / elapsed if elapsed else 0
+    click.echo(f"Imported {loaded} {kind} in {elapsed:.1f}s ({rate:.0f} rows/s)")
+
+
+@app.cli.command("export-data")
+@click.argument("kind", type=click.Choice(sorted(exporter.EXPORTS)))
+@click.option(
+    "--format", "format", type=click.Choice(sorted(exporter.FORMATS)), default="csv"
+)
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-")
+def export_data_command(kind, format, output):
+    """Stream venues, artists or shows out as CSV or NDJSON."""
+    for chunk in exporter.export_rows(kind, format):
+        output.write(chunk)
+
+
+@app.cli.command("roll-over-shows")
+def roll_over_shows():
+    """Move shows that have started from the upcoming to the past counters.
+
+    Scheduled by run-jobs (JOB_INTERVALS), or run it from cron."""
+    moved = counters.roll_over()
+    if moved["venues"]:
+        areas.changed()
+    for table, count in moved.items():
+        click.echo(f"{table}: {count} rolled over")
+
+
+@app.cli.command("refresh-venue-areas")
+def refresh_venue_areas():
+    """Rebuild the precomputed venues directory.
+
+    Scheduled by run-jobs when VENUE_AREAS_MODE is "precomputed"."""
+    areas.refresh()
+    click.echo("venue_areas refreshed")
+
+
+@app.cli.command("reconcile-counters")
+@click.option("--fix", is_flag=True, help="Rewrite the counters that drifted.")
+def reconcile_counters(fix):
+    """Check the venue and artist show counters against the shows table."""
+    mismatches = counters.reconcile(fix=fix)
+    for table, row_id, column, stored, actual in mismatches:
+        click.echo(f"{table} {row_id}: {column} is {stored}, expected {actual}")
+    rows = len({(table, row_id) for table, row_id, *_ in mismatches})
+    click.echo(f"{rows} rows drifted" + (", fixed" if fix and rows else ""))
+    if mismatches and not fix:
+        raise SystemExit(1)
+
+
+@app.cli.command("prune-show-changes")
+def prune_show_changes():
+    """Delete show changes older than any unexpired calendar sync cursor.
+
+    Scheduled daily by run-jobs; see CALENDAR_SYNC_RETENTION_DAYS."""
+    deleted = calendars.prune(app.config)
+    click.echo(f"{deleted} show changes pruned")
+
+
+@app.cli.command("run-jobs")
+def run_jobs():
+    """Run roll-over-shows, refresh-venue-areas and prune-show-changes.
+
+    Each runs at start and then every JOB_INTERVALS seconds until stopped.
+    This is the Procfile's clock process; run exactly one."""
+    jobs.run_forever(app)
+
+
 if not app.debug:
     file_handler = FileHandler("error.log")
     file_handler.setFormatter(
@@ -556,10 +616,18 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info("errors")
 
+slow_query_handler = FileHandler(app.config["SLOW_QUERY_LOG"])
+slow_query_handler.setFormatter(Formatter("%(asctime)s %(levelname)s: %(message)s"))
+slow_query_logger = instrumentation.slow_query_logger
+slow_query_logger.addHandler(slow_query_handler)
+slow_query_logger.setLevel(logging.WARNING)
+slow_query_logger.propagate = False
+
 # ----------------------------------------------------------------------------#
 # Launch.
 # ----------------------------------------------------------------------------#
 
+# Development server only; production runs wsgi.py under gunicorn.
 # Default port:
 if __name__ == "__main__":
     app.run()
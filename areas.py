@@ -0,0 +1,60 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+from flask import current_app
+from sqlalchemy import Integer, String, column, table, text
+
+import queries
+from models import db
+
+# The venue_areas materialized view, see migration 56c808e6aa9b. It is not
+# part of db.metadata so db.create_all() does not create it as a table.
+venue_areas_view = table(
+    "venue_areas",
+    column("state", String),
+    column("city", String),
+    column("name", String),
+    column("id", Integer),
+    column("num_upcoming_shows", Integer),
+)
+
+KEY = [
+    venue_areas_view.c.state,
+    venue_areas_view.c.city,
+    venue_areas_view.c.name,
+    venue_areas_view.c.id,
+]
+
+# ----------------------------------------------------------------------------#
+# Listing.
+# ----------------------------------------------------------------------------#
+
+
+def _precomputed():
+    return current_app.config["VENUE_AREAS_MODE"] == "precomputed"
+
+
+def venue_areas(per_page, after=None, before=None):
+    # The venues directory, read live from venues or, with
+    # VENUE_AREAS_MODE = "precomputed", from the venue_areas view.
+    if not _precomputed():
+        return queries.venue_areas(per_page, after=after, before=before)
+    query = db.session.query(*KEY, venue_areas_view.c.num_upcoming_shows)
+    page = queries.keyset_page(query, KEY, per_page, after=after, before=before)
+    return queries.group_areas(page)
+
+
+def refresh():
+    # CONCURRENTLY keeps the view readable while it is rebuilt; it relies on
+    # the view's unique index.
+    db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY venue_areas"))
+    db.session.commit()
+
+
+def changed():
+    # Called after venue writes, and once after the commands that write
+    # shows in bulk (imports, roll-over). Single show writes leave the
+    # view's upcoming counts to the refresh-venue-areas job rather than
+    # rebuild the whole view inside the request.
+    if _precomputed():
+        refresh()
@@ -0,0 +1,191 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import io
+import sys
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import g, render_template, request
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from werkzeug.exceptions import HTTPException, NotFound
+
+import clock
+import pool
+import queries
+from app import app, page_cache
+from models import Venue, Artist
+
+# ASGI entry point, e.g. `uvicorn asgi:application --workers 4`.
+#
+# The venue and artist pages are served on the event loop, reading through
+# asyncpg and an asyncio connection pool, so a worker keeps serving other
+# requests while it waits on Postgres. They use the same queries, page
+# cache and templates as app.py. Every other route is the WSGI app, run in
+# a thread pool by asgiref. Requires the optional `asyncpg`, `asgiref` and
+# an ASGI server such as `uvicorn`: pip install -r requirements-asgi.txt.
+
+engine = create_async_engine(
+    app.config["SQLALCHEMY_ASYNC_DATABASE_URI"],
+    **pool.async_engine_options(app.config),
+)
+Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+wsgi_application = WsgiToAsgi(app)
+
+# ----------------------------------------------------------------------------#
+# Views.
+# ----------------------------------------------------------------------------#
+
+
+async def venue_detail(venue_id):
+    async with Session() as session:
+        venue = await session.get(Venue, venue_id)
+        if venue is None:
+            return None
+        statement = queries.venue_shows(venue_id, clock.now())
+        rows = (await session.execute(statement)).all()
+    return queries.venue_payload(venue, rows)
+
+
+async def artist_detail(artist_id):
+    async with Session() as session:
+        artist = await session.get(Artist, artist_id)
+        if artist is None:
+            return None
+        statement = queries.artist_shows(artist_id, clock.now())
+        rows = (await session.execute(statement)).all()
+    return queries.artist_payload(artist, rows)
+
+
+async def show_venue(venue_id):
+    venue = await page_cache.get_or_load_async("venue", venue_id, venue_detail)
+    if venue is None:
+        raise NotFound()
+    return render_template("pages/show_venue.html", venue=venue)
+
+
+async def show_artist(artist_id):
+    artist = await page_cache.get_or_load_async("artist", artist_id, artist_detail)
+    if artist is None:
+        raise NotFound()
+    return render_template("pages/show_artist.html", artist=artist)
+
+
+# Endpoints of app.py served by the coroutines above.
+ASYNC_VIEWS = {"show_venue": show_venue, "show_artist": show_artist}
+
+# ----------------------------------------------------------------------------#
+# Application.
+# ----------------------------------------------------------------------------#
+
+
+def _environ(scope):
+    # WSGI environ for a GET or HEAD, enough for Flask's request context:
+    # routing, query string, headers and the session cookie.
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": "HTTP/" + scope["http_version"],
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = "HTTP_" + name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key in environ:
+            # Repeated headers are one comma separated list, except Cookie
+            # whose pairs are separated by semicolons.
+            separator = "; " if key == "HTTP_COOKIE" else ","
+            value = environ[key] + separator + value
+        environ[key] = value
+    return environ
+
+
+def _endpoint(environ):
+    try:
+        endpoint, _ = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    return endpoint
+
+
+def _apply_view_marks(endpoint):
+    # What the @read_only and @cache_policy decorators of the app.py view
+    # would have set; the coroutine replaces the whole decorated view.
+    view = app.view_functions[endpoint]
+    if getattr(view, "read_only", False):
+        g.db_read_only = True
+    policy = getattr(view, "cache_policy", None)
+    if policy is not None:
+        g.cache_policy = policy
+
+
+async def _dispatch(endpoint, environ):
+    # Flask's wsgi_app and full_dispatch_request with an awaited view:
+    # before_request, after_request and the error handlers all run as they
+    # do under WSGI.
+    with app.request_context(environ):
+        try:
+            try:
+                response = app.preprocess_request()
+                if response is None:
+                    _apply_view_marks(endpoint)
+                    view = ASYNC_VIEWS[endpoint]
+                    response = await view(**request.view_args)
+            except Exception as error:
+                response = app.handle_user_exception(error)
+            return app.finalize_request(response)
+        except Exception as error:
+            return app.make_response(app.handle_exception(error))
+
+
+async def _send(response, send, method):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in response.headers.items()
+            ],
+        }
+    )
+    body = b"" if method == "HEAD" else response.get_data()
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await engine.dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+
+    if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+        environ = _environ(scope)
+        endpoint = _endpoint(environ)
+        if endpoint in ASYNC_VIEWS:
+            response = await _dispatch(endpoint, environ)
+            return await _send(response, send, scope["method"])
+
+    return await wsgi_application(scope, receive, send)
@@ -0,0 +1,200 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import event, inspect, orm
+
+from models import db, name_key, Venue, Artist
+
+# ----------------------------------------------------------------------------#
+# Name index.
+# ----------------------------------------------------------------------------#
+
+
+class NameIndex:
+    # The names of one model as parallel arrays sorted by (lowercased name,
+    # id), so the names starting with a prefix are one bisect and a slice
+    # away. Loaded from the database in a background thread, patched in
+    # place on commits made by this process, and reloaded every
+    # AUTOCOMPLETE_MAX_AGE seconds to pick up other processes' writes.
+
+    def __init__(self, model):
+        self.model = model
+        self.loaded_at = None
+        self.loading = False
+        self._lock = threading.Lock()
+        self._keys = []
+        self._ids = []
+        self._names = {}
+        # Commits seen while a load runs, replayed on top of its snapshot.
+        self._pending = []
+
+    def load(self):
+        # Straight off the DBAPI cursor: building a million result rows in
+        # SQLAlchemy takes several times longer than the query itself.
+        cursor = db.session.connection().connection.cursor()
+        cursor.execute(f"SELECT id, name FROM {self.model.__tablename__}")
+        rows = cursor.fetchall()
+        cursor.close()
+        entries = sorted((name.lower(), entity_id) for entity_id, name in rows)
+        keys = [key for key, _ in entries]
+        ids = [entity_id for _, entity_id in entries]
+        names = dict(rows)
+        with self._lock:
+            self._keys, self._ids, self._names = keys, ids, names
+            for entity_id, name in self._pending:
+                self._set(entity_id, name)
+            self._pending = []
+            self.loaded_at = time.monotonic()
+            self.loading = False
+
+    def _load_in_background(self, app):
+        def run():
+            try:
+                with app.app_context():
+                    self.load()
+            except Exception:
+                app.logger.exception("autocomplete: loading %s failed", self.model)
+                with self._lock:
+                    self.loading = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def ready(self, app):
+        # True when lookups can be served from memory. Otherwise (not
+        # loaded yet) the caller falls back to SQL; either way a (re)load is
+        # started if one is due.
+        max_age = app.config["AUTOCOMPLETE_MAX_AGE"]
+        with self._lock:
+            loaded_at = self.loaded_at
+            due = loaded_at is None or time.monotonic() - loaded_at > max_age
+            start = due and not self.loading
+            if start:
+                self.loading = True
+                self._pending = []
+        if start:
+            self._load_in_background(app)
+        return loaded_at is not None
+
+    def _position(self, key, entity_id):
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key and self._ids[i] < entity_id:
+            i += 1
+        return i
+
+    def _set(self, entity_id, name):
+        # Removes the entry of `entity_id`, if any, and inserts it again
+        # under `name` unless that is None (a delete).
+        old = self._names.pop(entity_id, None)
+        if old is not None:
+            i = self._position(old.lower(), entity_id)
+            if i < len(self._ids) and self._ids[i] == entity_id:
+                del self._keys[i]
+                del self._ids[i]
+        if name is not None:
+            key = name.lower()
+            i = self._position(key, entity_id)
+            self._keys.insert(i, key)
+            self._ids.insert(i, entity_id)
+            self._names[entity_id] = name
+
+    def apply(self, changes):
+        with self._lock:
+            if self.loading:
+                self._pending.extend(changes)
+            for entity_id, name in changes:
+                self._set(entity_id, name)
+
+    def lookup(self, prefix, limit):
+        key = prefix.lower()
+        with self._lock:
+            i = bisect_left(self._keys, key)
+            matches = []
+            while (
+                i < len(self._keys)
+                and len(matches) < limit
+                and self._keys[i].startswith(key)
+            ):
+                entity_id = self._ids[i]
+                matches.append({"id": entity_id, "name": self._names[entity_id]})
+                i += 1
+        return matches
+
+
+_indexes = {Venue: NameIndex(Venue), Artist: NameIndex(Artist)}
+
+
+# ----------------------------------------------------------------------------#
+# Sync.
+# ----------------------------------------------------------------------------#
+
+
+def _record(db_session, model, entity_id, name):
+    db_session.info.setdefault("autocomplete", []).append((model, entity_id, name))
+
+
+def _after_insert(mapper, connection, target):
+    _record(orm.object_session(target), type(target), target.id, target.name)
+
+
+def _after_update(mapper, connection, target):
+    if inspect(target).attrs.name.history.has_changes():
+        _record(orm.object_session(target), type(target), target.id, target.name)
+
+
+def _after_delete(mapper, connection, target):
+    _record(orm.object_session(target), type(target), target.id, None)
+
+
+def _after_commit(db_session):
+    # Only committed names reach the index, in the order they were written.
+    changes = db_session.info.pop("autocomplete", None)
+    if not changes:
+        return
+    for model, index in _indexes.items():
+        index.apply([(i, name) for m, i, name in changes if m is model])
+
+
+def _after_rollback(db_session):
+    db_session.info.pop("autocomplete", None)
+
+
+for _model in _indexes:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
+event.listen(orm.Session, "after_commit", _after_commit)
+event.listen(orm.Session, "after_rollback", _after_rollback)
+
+# ----------------------------------------------------------------------------#
+# Lookup.
+# ----------------------------------------------------------------------------#
+
+
+def _sql_lookup(model, prefix, limit):
+    # LIKE 'prefix%' in the "C" collation is a range scan of the
+    # (name_key, id) index, already in the order we return.
+    key = name_key(model.name)
+    rows = (
+        db.session.query(model.id, model.name)
+        .filter(key.startswith(prefix.lower(), autoescape=True))
+        .order_by(key, model.id)
+        .limit(limit)
+    )
+    return [{"id": row.id, "name": row.name} for row in rows]
+
+
+def complete(model, prefix, limit):
+    # Up to `limit` {"id", "name"} whose name starts with `prefix`, ignoring
+    # case, by name.
+    if not prefix:
+        return []
+    app = current_app._get_current_object()
+    index = _indexes[model]
+    if app.config["AUTOCOMPLETE_INDEX"] and index.ready(app):
+        return index.lookup(prefix, limit)
+    return _sql_lookup(model, prefix, limit)
@@ -0,0 +1,279 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from instrumentation import current_stats
+
+# ----------------------------------------------------------------------------#
+# Backends.
+# ----------------------------------------------------------------------------#
+
+
+class LRUBackend:
+    # Bounded in-process store. Entries expire after `ttl` seconds and the
+    # least recently used entry is evicted once `max_size` is reached.
+
+    def __init__(self, max_size=512, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + (ttl or self.ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    # Shared store so every worker process sees the same entries and the
+    # same invalidations. Requires the optional `redis` package.
+
+    def __init__(self, url, ttl=300, prefix="fyyur:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullBackend:
+    # Stores nothing, for turning a cache off: every lookup misses and goes
+    # to the loader.
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+# ----------------------------------------------------------------------------#
+# Page cache.
+# ----------------------------------------------------------------------------#
+
+
+class PageCache:
+    # Read-through cache for assembled page payloads, keyed by entity kind
+    # and id (e.g. "venue:3").
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config):
+        ttl = config.get("PAGE_CACHE_TTL", 300)
+        if config.get("PAGE_CACHE_BACKEND") == "redis":
+            backend = RedisBackend(config["PAGE_CACHE_REDIS_URL"], ttl=ttl)
+        elif config.get("PAGE_CACHE_BACKEND") == "none":
+            backend = NullBackend()
+        else:
+            backend = LRUBackend(config.get("PAGE_CACHE_SIZE", 512), ttl=ttl)
+        return cls(backend)
+
+    def init_app(self, app):
+        # Lets blueprints reach the cache as current_app.extensions["page_cache"].
+        app.extensions["page_cache"] = self
+
+    @staticmethod
+    def key(kind, entity_id):
+        return f"{kind}:{int(entity_id)}"
+
+    def get_or_load(self, kind, entity_id, loader):
+        key = self.key(kind, entity_id)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader(entity_id)
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    async def get_or_load_async(self, kind, entity_id, loader):
+        # Same as get_or_load for a coroutine loader (see asgi.py).
+        key = self.key(kind, entity_id)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await loader(entity_id)
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    def invalidate(self, kind, *entity_ids):
+        self.backend.delete(
+            *[
+                self.key(kind, entity_id)
+                for entity_id in entity_ids
+                if entity_id is not None
+            ]
+        )
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# ----------------------------------------------------------------------------#
+# Fragment cache.
+# ----------------------------------------------------------------------------#
+
+
+class FragmentCache:
+    # Store behind the {% cache key, ttl %} template tag. Keys should carry
+    # the versions (updated_at) of every entity the fragment shows, so a
+    # change to one entity only misses the fragments that display it and
+    # stale entries simply age out.
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        ttl = config.get("FRAGMENT_CACHE_TTL", 3600)
+        if config.get("FRAGMENT_CACHE_BACKEND") == "redis":
+            backend = RedisBackend(
+                config["PAGE_CACHE_REDIS_URL"], ttl=ttl, prefix="fyyur:fragment:"
+            )
+        elif config.get("FRAGMENT_CACHE_BACKEND") == "none":
+            backend = NullBackend()
+        else:
+            backend = LRUBackend(config.get("FRAGMENT_CACHE_SIZE", 4096), ttl=ttl)
+        return cls(backend)
+
+    def init_app(self, app):
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.extend(fragment_cache=self)
+
+    @staticmethod
+    def key(key):
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def fetch(self, key, ttl, render):
+        # Returns the cached fragment for `key`, or renders, stores and
+        # returns it. The render time of a fragment is stored with it and
+        # counted as saved on every hit.
+        key = self.key(key)
+        entry = self.backend.get(key)
+        stats = current_stats()
+        if entry is not None:
+            html, cost = entry
+            self.hits += 1
+            self.saved += cost
+            if stats is not None:
+                stats.fragment_hits += 1
+                stats.fragment_saved += cost
+            return Markup(html)
+
+        self.misses += 1
+        started = time.perf_counter()
+        html = str(render())
+        self.backend.set(key, (html, time.perf_counter() - started), ttl)
+        return Markup(html)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "saved_seconds_total": self.saved,
+        }
+
+
+class FragmentCacheExtension(Extension):
+    # {% cache key, ttl %}...{% endcache %}; the ttl (seconds) is optional.
+    # Use a parenthesised tuple for a composite key.
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache", args), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache(self, key, ttl, caller):
+        return self.environment.fragment_cache.fetch(key, ttl, caller)
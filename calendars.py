@@ -0,0 +1,232 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import time
+from datetime import timedelta
+
+import dateutil.parser
+from dateutil import tz
+from sqlalchemy import BigInteger, Text, cast, func, select
+
+import clock
+from models import db, INT4, Venue, Artist, Show, ShowChange
+
+
+class CursorExpired(ValueError):
+    # The change log no longer reaches back to the cursor; the subscriber
+    # has to download the range again without ?since=.
+    pass
+
+
+# ----------------------------------------------------------------------------#
+# Parsing.
+# ----------------------------------------------------------------------------#
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    return clock.aware(dateutil.parser.isoparse(value))
+
+
+def parse_range(args, config):
+    # ?start= and ?end= as ISO 8601 dates or date-times, naive ones in the
+    # app's TIMEZONE. They default to today's midnight and CALENDAR_DAYS
+    # after start. Raises ValueError for anything else, an empty range, or
+    # one longer than CALENDAR_MAX_DAYS.
+    start = _parse_time(args.get("start"))
+    if start is None:
+        start = clock.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = _parse_time(args.get("end"))
+    try:
+        if end is None:
+            end = start + timedelta(days=config["CALENDAR_DAYS"])
+        longest = start + timedelta(days=config["CALENDAR_MAX_DAYS"])
+    except OverflowError:
+        raise ValueError("start is too far in the future")
+    if not start < end <= longest:
+        raise ValueError("end must be after start, within CALENDAR_MAX_DAYS")
+    return start, end
+
+
+def parse_filters(args):
+    # ?venue_id=, ?artist_id= and ?city= (of the venue). Raises ValueError
+    # for an id that is not a number an id column can hold, or a city with
+    # a NUL character, either of which Postgres would reject.
+    filters = {"city": args.get("city") or None}
+    if filters["city"] is not None and "\x00" in filters["city"]:
+        raise ValueError("city cannot contain NUL")
+    for key in ("venue_id", "artist_id"):
+        value = args.get(key)
+        filters[key] = int(value) if value else None
+        if filters[key] is not None and filters[key] not in INT4:
+            raise ValueError(f"{key} is out of range")
+    return filters
+
+
+# ----------------------------------------------------------------------------#
+# Cursors.
+# ----------------------------------------------------------------------------#
+
+# The oldest transaction still running, as a bigint like show_changes.txid.
+# Every transaction below it has committed or aborted, and so is visible
+# to any later statement.
+snapshot_xmin = cast(
+    cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger
+)
+
+
+def cursor(xmin):
+    # "<xmin>-<issued at>". A subscriber that syncs with it gets the changes
+    # of every transaction from xmin on. Transactions that were still
+    # running when the cursor was issued have txid >= xmin, so a change
+    # that commits late is sent on the next sync instead of being missed.
+    # The price is that a change may be sent twice.
+    return f"{xmin}-{int(time.time())}"
+
+
+def parse_cursor(value, config):
+    # The xmin of a cursor. Raises CursorExpired once it is older than
+    # the change log is kept (CALENDAR_SYNC_RETENTION_DAYS), and
+    # ValueError if it is not a cursor.
+    xmin, issued_at = (int(part) for part in value.split("-"))
+    retention = config["CALENDAR_SYNC_RETENTION_DAYS"] * 24 * 3600
+    if issued_at < time.time() - retention:
+        raise CursorExpired("cursor expired")
+    return xmin
+
+
+def prune(config):
+    # Deletes the changes no unexpired cursor can ask for, keeping an hour
+    # to spare for the transactions that were running when the oldest
+    # cursor was issued. Returns the number of rows deleted.
+    days = config["CALENDAR_SYNC_RETENTION_DAYS"]
+    deleted = (
+        db.session.query(ShowChange)
+        .filter(ShowChange.changed_at < clock.now() - timedelta(days=days, hours=1))
+        .delete(synchronize_session=False)
+    )
+    db.session.commit()
+    return deleted
+
+
+# ----------------------------------------------------------------------------#
+# Entries.
+# ----------------------------------------------------------------------------#
+
+
+def entries(start, end, filters, ids=None):
+    # Shows starting in [start, end) that match `filters` (and, if given,
+    # are among `ids`), by start time. A range scan of
+    # ix_shows_start_time_id, or of ix_shows_{venue,artist}_id_start_time
+    # when filtering by venue or artist.
+    query = (
+        select(
+            Show.id,
+            Show.start_time,
+            Show.end_time,
+            Venue.id.label("venue_id"),
+            Venue.name.label("venue_name"),
+            Venue.address,
+            Venue.city,
+            Venue.state,
+            Artist.id.label("artist_id"),
+            Artist.name.label("artist_name"),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+        .where(Show.start_time >= start, Show.start_time < end)
+        .order_by(Show.start_time, Show.id)
+    )
+    if filters["venue_id"] is not None:
+        query = query.where(Show.venue_id == filters["venue_id"])
+    if filters["artist_id"] is not None:
+        query = query.where(Show.artist_id == filters["artist_id"])
+    if filters["city"]:
+        query = query.where(Venue.city == filters["city"])
+    if ids is not None:
+        query = query.where(Show.id.in_(ids))
+    return [dict(row._mapping) for row in db.session.execute(query)]
+
+
+def changes(start, end, filters, since):
+    # What a subscriber holding the cursor `since` must apply: "shows" to
+    # add or replace, and the ids "removed" from its view. A removed show
+    # may have been deleted, moved out of the range, or edited so that it
+    # no longer matches the filters.
+    xmin = db.session.execute(select(snapshot_xmin)).scalar()
+    changed = sorted(
+        db.session.execute(
+            select(ShowChange.show_id).where(ShowChange.txid >= since).distinct()
+        ).scalars()
+    )
+    shows = entries(start, end, filters, changed) if changed else []
+    current = {show["id"] for show in shows}
+    return {
+        "shows": shows,
+        "removed": [show_id for show_id in changed if show_id not in current],
+        "cursor": cursor(xmin),
+    }
+
+
+# ----------------------------------------------------------------------------#
+# iCalendar.
+# ----------------------------------------------------------------------------#
+
+
+def _ical_time(value):
+    return value.astimezone(tz.UTC).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _ical_text(value):
+    return (
+        (value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    # RFC 5545 3.1: content lines longer than 75 octets go on over CRLF and
+    # a space, without splitting a UTF-8 sequence.
+    encoded = line.encode()
+    parts = []
+    limit = 75
+    while len(encoded) > limit:
+        cut = limit
+        while encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+        limit = 74
+    parts.append(encoded.decode())
+    return "\r\n ".join(parts)
+
+
+def to_ical(shows, host):
+    # A VCALENDAR with one VEVENT per show. UIDs stay the same across
+    # downloads, so calendar apps update events in place.
+    stamp = _ical_time(clock.now())
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Fyyur//Shows//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:Fyyur shows",
+    ]
+    for show in shows:
+        location = f"{show['address']}, {show['city']}, {show['state']}"
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:show-{show['id']}@{host}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{_ical_time(show['start_time'])}",
+            f"DTEND:{_ical_time(show['end_time'])}",
+            f"SUMMARY:{_ical_text(show['artist_name'] + ' at ' + show['venue_name'])}",
+            f"LOCATION:{_ical_text(location)}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines)
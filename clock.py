@@ -0,0 +1,38 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+from datetime import datetime
+
+from dateutil import tz
+from flask import current_app, g, has_app_context
+
+# ----------------------------------------------------------------------------#
+# Clock.
+# ----------------------------------------------------------------------------#
+
+
+def zone():
+    # The app's TIMEZONE. Naive datetimes (form input, imported rows) are
+    # wall-clock times in it, and database sessions use it too, see
+    # pool.engine_options.
+    if has_app_context():
+        return tz.gettz(current_app.config["TIMEZONE"])
+    return tz.UTC
+
+
+def now():
+    # The current time, timezone-aware and taken once per request (or CLI
+    # command): every past/upcoming boundary of a request is the same
+    # instant and is sent to Postgres as the same parameter.
+    if not has_app_context():
+        return datetime.now(tz.UTC)
+    if "now" not in g:
+        g.now = datetime.now(zone())
+    return g.now
+
+
+def aware(value):
+    # Reads a naive datetime as wall-clock time in the app's TIMEZONE.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=zone())
+    return value
@@ -0,0 +1,151 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+from sqlalchemy import event, func, inspect, select
+
+import clock
+from models import db, Venue, Artist, Show
+
+# Show column that points at each model carrying counters.
+OWNERS = {Venue: Show.venue_id, Artist: Show.artist_id}
+
+COUNTERS = ("upcoming_shows_count", "past_shows_count", "next_show_at")
+
+# ----------------------------------------------------------------------------#
+# Recounting.
+# ----------------------------------------------------------------------------#
+
+
+def _actual(model, now):
+    # Correlated subqueries giving the true counter values for each row of
+    # `model`, served by the (owner id, start_time) show indexes.
+    owner = OWNERS[model]
+
+    def shows(aggregate, *criteria):
+        return (
+            select(aggregate)
+            .where(owner == model.id, *criteria)
+            .correlate(model)
+            .scalar_subquery()
+        )
+
+    return {
+        "upcoming_shows_count": shows(func.count(Show.id), Show.start_time > now),
+        "past_shows_count": shows(func.count(Show.id), Show.start_time <= now),
+        "next_show_at": shows(func.min(Show.start_time), Show.start_time > now),
+    }
+
+
+def refresh(model, ids=None, connection=None, now=None):
+    # Recomputes the counters of the given rows (every row if ids is None)
+    # in one UPDATE. updated_at is left alone: the row itself did not change.
+    now = now or clock.now()
+    table = model.__table__
+    statement = table.update().values(
+        updated_at=table.c.updated_at, **_actual(model, now)
+    )
+    if ids is not None:
+        if not ids:
+            return 0
+        statement = statement.where(model.id.in_(ids))
+    return (connection or db.session).execute(statement).rowcount
+
+
+def roll_over(now=None):
+    # Moves shows that have started since the last run from upcoming to
+    # past. Only rows whose next_show_at has passed are touched.
+    now = now or clock.now()
+    moved = {}
+    for model in OWNERS:
+        ids = [
+            row.id
+            for row in db.session.query(model.id).filter(model.next_show_at <= now)
+        ]
+        moved[model.__tablename__] = refresh(model, ids, now=now)
+    db.session.commit()
+    return moved
+
+
+def reconcile(fix=False):
+    # Compares the stored counters with the shows table. Returns the
+    # mismatches as (table, id, column, stored, actual) and, with fix,
+    # rewrites the rows that drifted.
+    now = clock.now()
+    mismatches = []
+    for model in OWNERS:
+        actual = _actual(model, now)
+        rows = db.session.query(
+            model.id,
+            *[getattr(model, name) for name in COUNTERS],
+            *[actual[name].label("actual_" + name) for name in COUNTERS],
+        )
+        drifted = set()
+        for row in rows.yield_per(1000):
+            for name in COUNTERS:
+                stored, expected = getattr(row, name), getattr(row, "actual_" + name)
+                if stored != expected:
+                    mismatches.append(
+                        (model.__tablename__, row.id, name, stored, expected)
+                    )
+                    drifted.add(row.id)
+        if fix:
+            refresh(model, drifted, now=now)
+    if fix:
+        db.session.commit()
+    return mismatches
+
+
+# ----------------------------------------------------------------------------#
+# Maintenance on write.
+# ----------------------------------------------------------------------------#
+
+
+def _shift(connection, model, owner_id, start_time, step):
+    # Adds (step=1) or removes (step=-1) one show from an owner's counters
+    # inside the flush that wrote the show.
+    if owner_id is None or start_time is None:
+        return
+    table = model.__table__
+    now = clock.now()
+    if start_time > now:
+        if step > 0:
+            next_show_at = func.least(table.c.next_show_at, start_time)
+        else:
+            next_show_at = _actual(model, now)["next_show_at"]
+        values = {
+            "upcoming_shows_count": table.c.upcoming_shows_count + step,
+            "next_show_at": next_show_at,
+        }
+    else:
+        values = {"past_shows_count": table.c.past_shows_count + step}
+    connection.execute(
+        table.update()
+        .where(table.c.id == owner_id)
+        .values(updated_at=table.c.updated_at, **values)
+    )
+
+
+def _after_insert(mapper, connection, show):
+    _shift(connection, Venue, show.venue_id, show.start_time, 1)
+    _shift(connection, Artist, show.artist_id, show.start_time, 1)
+
+
+def _after_delete(mapper, connection, show):
+    _shift(connection, Venue, show.venue_id, show.start_time, -1)
+    _shift(connection, Artist, show.artist_id, show.start_time, -1)
+
+
+def _after_update(mapper, connection, show):
+    # A moved or rescheduled show is rare enough to just recount the owners
+    # it left and joined.
+    state = inspect(show)
+    for model, owner in OWNERS.items():
+        history = state.attrs[owner.key].history
+        if history.has_changes() or state.attrs.start_time.history.has_changes():
+            ids = {*history.deleted, *history.added, getattr(show, owner.key)}
+            refresh(model, ids - {None}, connection)
+
+
+event.listen(Show, "after_insert", _after_insert)
+event.listen(Show, "after_delete", _after_delete)
+event.listen(Show, "after_update", _after_update)
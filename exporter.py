@@ -0,0 +1,98 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import csv
+import io
+import json
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+# Column names follow the create forms (e.g. website_link), so an export
+# can be fed straight back to `flask import-data`.
+EXPORTS = {
+    "venues": (
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.address,
+        Venue.phone,
+        Venue.genres,
+        Venue.facebook_link,
+        Venue.image_link,
+        Venue.website.label("website_link"),
+        Venue.seeking_talent,
+        Venue.seeking_description,
+    ),
+    "artists": (
+        Artist.id,
+        Artist.name,
+        Artist.city,
+        Artist.state,
+        Artist.phone,
+        Artist.genres,
+        Artist.facebook_link,
+        Artist.image_link,
+        Artist.website.label("website_link"),
+        Artist.seeking_venue,
+        Artist.seeking_description,
+    ),
+    "shows": (Show.id, Show.artist_id, Show.venue_id, Show.start_time),
+}
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+CHUNK_ROWS = 1000
+
+# ----------------------------------------------------------------------------#
+# Encoding.
+# ----------------------------------------------------------------------------#
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ",".join(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def _rows(kind):
+    # Server-side cursor: rows arrive CHUNK_ROWS at a time and are never
+    # added to the identity map, so memory does not grow with table size.
+    columns = EXPORTS[kind]
+    return db.session.query(*columns).order_by(columns[0]).yield_per(CHUNK_ROWS)
+
+
+def export_rows(kind, format):
+    # Yields the export of `kind` as text chunks of up to CHUNK_ROWS rows.
+    names = [column.key for column in EXPORTS[kind]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(names)
+
+    count = 0
+    for row in _rows(kind):
+        if format == "csv":
+            writer.writerow([_csv_value(value) for value in row])
+        else:
+            record = {name: _json_value(value) for name, value in zip(names, row)}
+            buffer.write(json.dumps(record, separators=(",", ":")) + "\n")
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
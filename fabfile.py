@@ -38,6 +38,11 @@ def heroku():
     local("git push heroku master")
 
 
+def heroku_clock():
+    # exactly one clock dyno runs the maintenance jobs (flask run-jobs)
+    local("heroku ps:scale clock=1")
+
+
 def heroku_test():
     local(
         "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
@@ -49,8 +54,15 @@ def deploy():
     test()
     commit()
     heroku()
+    heroku_clock()
     heroku_test()
 
+# run the production server locally (the same command as the Procfile)
+
+
+def serve():
+    local("gunicorn wsgi:app")
+
 # rollback
 
 
@@ -0,0 +1,150 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+from sqlalchemy import String, cast, func, literal, null, select, true, union_all
+
+import queries
+from models import db, GENRE_CODES, Genre, Venue, Artist
+
+# The "looking for" flag of each model, filtered on as ?seeking=.
+SEEKING = {Venue: Venue.seeking_talent, Artist: Artist.seeking_venue}
+
+FACETS = ("genre", "state", "city", "seeking")
+
+# ----------------------------------------------------------------------------#
+# Filters.
+# ----------------------------------------------------------------------------#
+
+
+def parse_filters(args):
+    # ?genre= (repeatable, every genre must match), ?state=, ?city= and
+    # ?seeking=true|false. Raises ValueError for an unknown genre or
+    # anything else in seeking.
+    genres = args.getlist("genre")
+    if any(genre not in GENRE_CODES for genre in genres):
+        raise ValueError("unknown genre")
+    seeking = args.get("seeking")
+    if seeking not in (None, "true", "false"):
+        raise ValueError("seeking must be true or false")
+    return {
+        "genre": genres,
+        "state": args.get("state"),
+        "city": args.get("city"),
+        "seeking": None if seeking is None else seeking == "true",
+    }
+
+
+def _criteria(model, filters):
+    criteria = []
+    if filters["genre"]:
+        # genres @> ARRAY[codes], served by the GIN index on genres.
+        criteria.append(model.genres.contains(filters["genre"]))
+    if filters["state"]:
+        criteria.append(model.state == filters["state"])
+    if filters["city"]:
+        criteria.append(model.city == filters["city"])
+    if filters["seeking"] is not None:
+        criteria.append(SEEKING[model] == filters["seeking"])
+    return criteria
+
+
+# ----------------------------------------------------------------------------#
+# Results.
+# ----------------------------------------------------------------------------#
+
+
+def listing(model, filters):
+    # A keyset listing (see queries.load_page) of the rows matching
+    # `filters`, by name.
+    def page(per_page, after=None, before=None):
+        query = db.session.query(
+            model.id,
+            model.name,
+            model.city,
+            model.state,
+            model.genres,
+            SEEKING[model].label("seeking"),
+            model.upcoming_shows_count,
+        ).filter(*_criteria(model, filters))
+        page = queries.keyset_page(
+            query, [model.name, model.id], per_page, after=after, before=before
+        )
+        return page._replace(
+            items=[
+                {
+                    "id": row.id,
+                    "name": row.name,
+                    "city": row.city,
+                    "state": row.state,
+                    "genres": row.genres,
+                    "seeking": row.seeking,
+                    "num_upcoming_shows": row.upcoming_shows_count,
+                }
+                for row in page.items
+            ]
+        )
+
+    return page
+
+
+def facet_counts(model, filters, limit):
+    # The number of matching rows and, for each facet, its `limit` most
+    # common values among them. One statement: the matches are read once
+    # into a CTE and every facet is a GROUP BY over it, UNION ALLed. Genre
+    # codes are named through the genres table.
+    matched = (
+        select(model.genres, model.state, model.city, SEEKING[model].label("seeking"))
+        .where(*_criteria(model, filters))
+        .cte("matched")
+    )
+    code = func.unnest(matched.c.genres).table_valued("id").render_derived(name="code")
+
+    def counts(facet, value, source=matched):
+        return (
+            select(
+                literal(facet).label("facet"),
+                value.label("value"),
+                func.count().label("count"),
+            )
+            .select_from(source)
+            .group_by(value)
+        )
+
+    grouped = union_all(
+        select(
+            literal("total").label("facet"),
+            cast(null(), String).label("value"),
+            func.count().label("count"),
+        ).select_from(matched),
+        counts(
+            "genre",
+            Genre.name,
+            matched.join(code, true()).join(Genre, Genre.id == code.c.id),
+        ),
+        counts("state", matched.c.state),
+        counts("city", matched.c.city),
+        counts("seeking", cast(matched.c.seeking, String)),
+    ).subquery()
+    rank = (
+        func.row_number()
+        .over(
+            partition_by=grouped.c.facet,
+            order_by=(grouped.c.count.desc(), grouped.c.value),
+        )
+        .label("rank")
+    )
+    ranked = select(grouped, rank).subquery()
+    rows = db.session.execute(
+        select(ranked.c.facet, ranked.c.value, ranked.c.count)
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c.facet, ranked.c.rank)
+    ).all()
+
+    total = 0
+    facets = {facet: [] for facet in FACETS}
+    for row in rows:
+        if row.facet == "total":
+            total = row.count
+        else:
+            facets[row.facet].append({"value": row.value, "count": row.count})
+    return total, facets
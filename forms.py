@@ -5,14 +5,19 @@ from wtforms import (
     SelectField,
     SelectMultipleField,
     DateTimeField,
+    IntegerField,
     BooleanField,
 )
 from wtforms.validators import DataRequired, AnyOf, URL, Regexp
 
+from models import GENRES
+
+GENRE_CHOICES = [(name, name) for name in GENRES]
+
 
 class ShowForm(Form):
-    artist_id = StringField("artist_id")
-    venue_id = StringField("venue_id")
+    artist_id = IntegerField("artist_id", validators=[DataRequired()])
+    venue_id = IntegerField("venue_id", validators=[DataRequired()])
     start_time = DateTimeField(
         "start_time", validators=[DataRequired()], default=datetime.today()
     )
@@ -88,30 +93,9 @@ class VenueForm(Form):
     )
     image_link = StringField("image_link")
     genres = SelectMultipleField(
-        # TODO implement enum restriction
         "genres",
         validators=[DataRequired()],
-        choices=[
-            ("Alternative", "Alternative"),
-            ("Blues", "Blues"),
-            ("Classical", "Classical"),
-            ("Country", "Country"),
-            ("Electronic", "Electronic"),
-            ("Folk", "Folk"),
-            ("Funk", "Funk"),
-            ("Hip-Hop", "Hip-Hop"),
-            ("Heavy Metal", "Heavy Metal"),
-            ("Instrumental", "Instrumental"),
-            ("Jazz", "Jazz"),
-            ("Musical Theatre", "Musical Theatre"),
-            ("Pop", "Pop"),
-            ("Punk", "Punk"),
-            ("R&B", "R&B"),
-            ("Reggae", "Reggae"),
-            ("Rock n Roll", "Rock n Roll"),
-            ("Soul", "Soul"),
-            ("Other", "Other"),
-        ],
+        choices=GENRE_CHOICES,
     )
     facebook_link = StringField("facebook_link", validators=[URL()])
     website_link = StringField(
@@ -195,27 +179,7 @@ class ArtistForm(Form):
     genres = SelectMultipleField(
         "genres",
         validators=[DataRequired()],
-        choices=[
-            ("Alternative", "Alternative"),
-            ("Blues", "Blues"),
-            ("Classical", "Classical"),
-            ("Country", "Country"),
-            ("Electronic", "Electronic"),
-            ("Folk", "Folk"),
-            ("Funk", "Funk"),
-            ("Hip-Hop", "Hip-Hop"),
-            ("Heavy Metal", "Heavy Metal"),
-            ("Instrumental", "Instrumental"),
-            ("Jazz", "Jazz"),
-            ("Musical Theatre", "Musical Theatre"),
-            ("Pop", "Pop"),
-            ("Punk", "Punk"),
-            ("R&B", "R&B"),
-            ("Reggae", "Reggae"),
-            ("Rock n Roll", "Rock n Roll"),
-            ("Soul", "Soul"),
-            ("Other", "Other"),
-        ],
+        choices=GENRE_CHOICES,
     )
     facebook_link = StringField(
         # TODO implement enum restriction
@@ -0,0 +1,49 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import gc
+import multiprocessing
+import os
+
+# gunicorn reads this file from the working directory: `gunicorn wsgi:app`.
+# It binds to $PORT when that is set (Heroku), otherwise to 127.0.0.1:8000.
+
+# ----------------------------------------------------------------------------#
+# Workers.
+# ----------------------------------------------------------------------------#
+
+# Import the app once in the master so workers start already loaded and
+# share its memory pages copy-on-write.
+preload_app = True
+
+# The usual 2 x CPUs + 1 processes, each with a few threads to overlap
+# Postgres round trips. Keep DB_POOL_SIZE >= threads so a thread never
+# waits for a connection.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot accumulate; the jitter
+# keeps them from all restarting at once.
+max_requests = 1000
+max_requests_jitter = 100
+
+# ----------------------------------------------------------------------------#
+# Hooks.
+# ----------------------------------------------------------------------------#
+
+
+def when_ready(server):
+    # Everything imported so far lives as long as the process. Freezing it
+    # keeps the workers' garbage collector from writing to (and so copying)
+    # those shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from wsgi import dispose_engines
+
+    dispose_engines()
@@ -0,0 +1,273 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import exc
+from werkzeug.datastructures import MultiDict
+
+import counters
+import scheduling
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, SHOW_LENGTH, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Reading.
+# ----------------------------------------------------------------------------#
+
+
+def read_rows(stream, format):
+    # Yields (line number, row dict) pairs without loading the whole file.
+    # An NDJSON line that is not valid JSON comes out as None, for
+    # import_rows to reject like any other row that is not an object.
+    if format == "ndjson":
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, None
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def _formdata(row):
+    # Turns a CSV or NDJSON row into the MultiDict a form POST would carry.
+    # CSV genres are comma separated inside their cell.
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None or value is False:
+            continue
+        if key == "genres" and isinstance(value, str):
+            value = [genre.strip() for genre in value.split(",") if genre.strip()]
+        if isinstance(value, list):
+            for item in value:
+                data.add(key, str(item))
+        elif value is True:
+            data.add(key, "y")
+        else:
+            data.add(key, str(value))
+    return data
+
+
+# ----------------------------------------------------------------------------#
+# Row mapping.
+# ----------------------------------------------------------------------------#
+
+
+def _venue_values(form):
+    return {
+        "name": form.name.data,
+        "city": form.city.data,
+        "state": form.state.data,
+        "address": form.address.data,
+        "phone": form.phone.data,
+        "genres": form.genres.data,
+        "facebook_link": form.facebook_link.data,
+        "image_link": form.image_link.data,
+        "seeking_talent": form.seeking_talent.data,
+        "seeking_description": form.seeking_description.data,
+        "website": form.website_link.data,
+    }
+
+
+def _artist_values(form):
+    return {
+        "name": form.name.data,
+        "city": form.city.data,
+        "state": form.state.data,
+        "phone": form.phone.data,
+        "genres": form.genres.data,
+        "facebook_link": form.facebook_link.data,
+        "image_link": form.image_link.data,
+        "website": form.website_link.data,
+        "seeking_venue": form.seeking_venue.data,
+        "seeking_description": form.seeking_description.data,
+    }
+
+
+def _show_values(form):
+    return {
+        "artist_id": int(form.artist_id.data),
+        "venue_id": int(form.venue_id.data),
+        "start_time": form.start_time.data,
+        "end_time": form.start_time.data + SHOW_LENGTH,
+    }
+
+
+IMPORTERS = {
+    "venues": (VenueForm, Venue, _venue_values),
+    "artists": (ArtistForm, Artist, _artist_values),
+    "shows": (ShowForm, Show, _show_values),
+}
+
+# ----------------------------------------------------------------------------#
+# Loading.
+# ----------------------------------------------------------------------------#
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    rows = db.session.query(model.id).filter(model.id.in_(ids))
+    return {row.id for row in rows}
+
+
+def _check_show_references(batch, errors):
+    # Resolves every venue and artist id in the batch with one query per
+    # table and drops the rows that point at nothing.
+    venue_ids = _existing_ids(Venue, {values["venue_id"] for _, values in batch})
+    artist_ids = _existing_ids(Artist, {values["artist_id"] for _, values in batch})
+    valid = []
+    for line_no, values in batch:
+        if values["venue_id"] not in venue_ids:
+            errors.append((line_no, f"venue_id - no venue {values['venue_id']}"))
+        elif values["artist_id"] not in artist_ids:
+            errors.append((line_no, f"artist_id - no artist {values['artist_id']}"))
+        else:
+            valid.append((line_no, values))
+    return valid
+
+
+def _check_show_bookings(batch, errors):
+    # Drops the rows the booking exclusion constraints would reject: their
+    # venue or artist is already booked at that time, by a stored show or
+    # by an earlier line of the batch. One statement per batch, the same
+    # check as the batch API.
+    if not batch:
+        return batch
+    rejected = {}
+    for line_no, key, show_id, other_line in scheduling.conflicts(batch):
+        if show_id is not None:
+            message = f"{scheduling.OWNERS[key]} is booked by show {show_id}"
+        else:
+            message = f"{scheduling.OWNERS[key]} is booked by line {other_line}"
+        rejected.setdefault(line_no, f"{key} - {message}")
+    errors.extend(sorted(rejected.items()))
+    return [(line_no, values) for line_no, values in batch if line_no not in rejected]
+
+
+def _copy_value(value):
+    if isinstance(value, list):
+        items = [
+            '"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"'
+            for item in value
+        ]
+        return "{" + ",".join(items) + "}"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _copy(table, rows):
+    # Streams the batch through COPY ... FROM STDIN on the session's own
+    # connection, so it commits or rolls back with the rest of the batch.
+    # COPY bypasses SQLAlchemy's types, so their bind processing (genre
+    # names to codes) is applied here.
+    connection = db.session.connection()
+    columns = list(rows[0])
+    processors = [
+        table.c[column].type.bind_processor(connection.dialect) for column in columns
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = [row[column] for column in columns]
+        writer.writerow(
+            [
+                _copy_value(process(value) if process else value)
+                for process, value in zip(processors, values)
+            ]
+        )
+    buffer.seek(0)
+
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(
+        f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+def _load(model, batch, use_copy, errors):
+    # Inserts and commits one batch; returns how many rows it loaded. A
+    # show booked by another writer since the checks fails the batch's
+    # exclusion constraint, and the whole batch is reported as rejected.
+    rows = [values for _, values in batch]
+    if not rows:
+        return 0
+    try:
+        _insert(model, rows, use_copy)
+    except (exc.IntegrityError, db.engine.dialect.dbapi.IntegrityError) as error:
+        # COPY runs on the raw cursor, so its errors are not wrapped.
+        db.session.rollback()
+        error = getattr(error, "orig", error)
+        if getattr(error, "pgcode", None) != scheduling.EXCLUSION_VIOLATION:
+            raise
+        errors.extend((line_no, "shows - booked meanwhile") for line_no, _ in batch)
+        return 0
+    return len(rows)
+
+
+def _insert(model, rows, use_copy):
+    if use_copy:
+        now = datetime.utcnow()
+        for row in rows:
+            row["updated_at"] = now
+        _copy(model.__table__, rows)
+    else:
+        db.session.execute(model.__table__.insert(), rows)
+    if model is Show:
+        # Bulk inserts skip the mapper events that keep the counters.
+        counters.refresh(Venue, {row["venue_id"] for row in rows})
+        counters.refresh(Artist, {row["artist_id"] for row in rows})
+    db.session.commit()
+
+
+def import_rows(kind, rows, batch_size=5000, use_copy=False, progress=None):
+    # Validates each row with the same form the create page uses and loads
+    # the valid ones in batches of `batch_size`. Returns (loaded, errors,
+    # elapsed seconds); errors are (line number, message) pairs.
+    form_class, model, to_values = IMPORTERS[kind]
+    use_copy = use_copy and db.engine.dialect.name == "postgresql"
+    loaded = 0
+    errors = []
+    batch = []
+    started = time.monotonic()
+
+    def flush():
+        nonlocal loaded, batch
+        if model is Show:
+            batch = _check_show_references(batch, errors)
+            batch = _check_show_bookings(batch, errors)
+        loaded += _load(model, batch, use_copy, errors)
+        batch = []
+        if progress:
+            progress(loaded, len(errors), time.monotonic() - started)
+
+    for line_no, row in rows:
+        if not isinstance(row, dict):
+            errors.append((line_no, "row - must be a JSON object"))
+            continue
+        form = form_class(formdata=_formdata(row), meta={"csrf": False})
+        if not form.validate():
+            for field, messages in form.errors.items():
+                errors.append((line_no, f"{field} - {'; '.join(messages)}"))
+            continue
+        try:
+            values = to_values(form)
+        except (TypeError, ValueError):
+            errors.append((line_no, "artist_id/venue_id - must be numeric ids"))
+            continue
+        batch.append((line_no, values))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return loaded, errors, time.monotonic() - started
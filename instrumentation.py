@@ -0,0 +1,165 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import heapq
+import json
+import logging
+import time
+
+import jinja2
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ----------------------------------------------------------------------------#
+# Request stats.
+# ----------------------------------------------------------------------------#
+
+
+class RequestStats:
+    def __init__(self, keep_slowest):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        # Fragments served by the {% cache %} tag and the render time that
+        # rendering them again would have cost.
+        self.fragment_hits = 0
+        self.fragment_saved = 0.0
+        self.keep_slowest = keep_slowest
+        self._slowest = []
+
+    def record_query(self, statement, duration):
+        self.query_count += 1
+        self.db_time += duration
+        entry = (duration, self.query_count, statement)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        return [
+            {"ms": round(duration * 1000, 2), "statement": statement}
+            for duration, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+
+def current_stats():
+    if has_app_context():
+        return g.get("request_stats")
+    return None
+
+
+class TimedTemplate(jinja2.Template):
+    # Adds each top-level render (extends/include run inside it) to the
+    # current request's render time.
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats = current_stats()
+            if stats is not None:
+                stats.render_time += time.perf_counter() - started
+
+
+# ----------------------------------------------------------------------------#
+# Extension.
+# ----------------------------------------------------------------------------#
+
+
+class Instrumentation:
+    # Records query count, DB time, template render time and the slowest
+    # statements of every request. They are reported as a Server-Timing
+    # header and one JSON log line per request. Any statement slower than
+    # SLOW_QUERY_THRESHOLD_MS is also written to the slow query log.
+
+    def __init__(self, app=None):
+        self.request_logger = None
+        self.slow_query_logger = None
+        self.slow_query_threshold = None
+        self.keep_slowest = None
+        self.server_timing = None
+        self.request_log = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SLOW_QUERY_THRESHOLD_MS", 200)
+        app.config.setdefault("SLOW_QUERY_LOG", "slow-query.log")
+        app.config.setdefault("INSTRUMENTATION_SLOWEST_QUERIES", 3)
+        app.config.setdefault("SERVER_TIMING", True)
+        app.config.setdefault("REQUEST_LOG", True)
+
+        self.slow_query_threshold = app.config["SLOW_QUERY_THRESHOLD_MS"] / 1000
+        self.request_logger = logging.getLogger(app.logger.name + ".requests")
+        self.slow_query_logger = logging.getLogger(app.logger.name + ".slow_queries")
+        self.keep_slowest = app.config["INSTRUMENTATION_SLOWEST_QUERIES"]
+        self.server_timing = app.config["SERVER_TIMING"]
+        self.request_log = app.config["REQUEST_LOG"]
+
+        app.jinja_env.template_class = TimedTemplate
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, *args
+    ):
+        # Kept on the statement's execution context, which is dropped with
+        # it whether the statement succeeds or fails.
+        context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, *args
+    ):
+        duration = time.perf_counter() - context._query_started
+        stats = current_stats()
+        if stats is not None:
+            stats.record_query(statement, duration)
+        if duration >= self.slow_query_threshold:
+            self.slow_query_logger.warning(
+                "%.1fms %s %r", duration * 1000, statement, parameters
+            )
+
+    def _start_request(self):
+        g.request_stats = RequestStats(self.keep_slowest)
+
+    def _finish_request(self, response):
+        stats = g.pop("request_stats", None)
+        if stats is None:
+            return response
+
+        total = time.perf_counter() - stats.started
+        if self.server_timing:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries", '
+                f"render;dur={stats.render_time * 1000:.1f}, "
+                f"fragments;dur={stats.fragment_saved * 1000:.1f};"
+                f'desc="{stats.fragment_hits} cached", '
+                f"total;dur={total * 1000:.1f}",
+            )
+        if not self.request_log:
+            return response
+        self.request_logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.full_path.rstrip("?"),
+                    "status": response.status_code,
+                    "total_ms": round(total * 1000, 2),
+                    "db_ms": round(stats.db_time * 1000, 2),
+                    "queries": stats.query_count,
+                    "render_ms": round(stats.render_time * 1000, 2),
+                    "fragment_hits": stats.fragment_hits,
+                    "render_saved_ms": round(stats.fragment_saved * 1000, 2),
+                    "slowest": stats.slowest,
+                },
+                separators=(",", ":"),
+            )
+        )
+        return response
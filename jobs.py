@@ -0,0 +1,67 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import time
+
+import areas
+import calendars
+import counters
+
+# ----------------------------------------------------------------------------#
+# Jobs.
+# ----------------------------------------------------------------------------#
+
+
+def roll_over_shows(app):
+    moved = counters.roll_over()
+    if moved["venues"]:
+        areas.changed()
+    return ", ".join(f"{table}: {count} rolled over" for table, count in moved.items())
+
+
+def refresh_venue_areas(app):
+    if app.config["VENUE_AREAS_MODE"] != "precomputed":
+        return "skipped, VENUE_AREAS_MODE is not precomputed"
+    areas.refresh()
+    return "venue_areas refreshed"
+
+
+def prune_show_changes(app):
+    return f"{calendars.prune(app.config)} show changes pruned"
+
+
+# The maintenance the app relies on, by the name of the CLI command that
+# runs it once. Their intervals are JOB_INTERVALS.
+JOBS = {
+    "roll-over-shows": roll_over_shows,
+    "refresh-venue-areas": refresh_venue_areas,
+    "prune-show-changes": prune_show_changes,
+}
+
+# ----------------------------------------------------------------------------#
+# Scheduler.
+# ----------------------------------------------------------------------------#
+
+
+def run_job(app, name):
+    # Runs one job in its own app context. A failure is logged and left for
+    # the next run, so one bad run does not stop the other jobs.
+    try:
+        with app.app_context():
+            app.logger.info("job %s: %s", name, JOBS[name](app))
+    except Exception:
+        app.logger.exception("job %s failed", name)
+
+
+def run_forever(app, clock=time.monotonic, sleep=time.sleep):
+    # Runs every job at start and then every JOB_INTERVALS[name] seconds,
+    # one at a time. Meant for a single process (the Procfile's clock);
+    # the jobs are safe to overlap with a cron run but gain nothing from it.
+    intervals = app.config["JOB_INTERVALS"]
+    due = {name: clock() for name in JOBS}
+    while True:
+        for name in JOBS:
+            if due[name] <= clock():
+                run_job(app, name)
+                due[name] = clock() + intervals[name]
+        sleep(max(min(due.values()) - clock(), 0))
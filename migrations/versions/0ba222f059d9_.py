@@ -0,0 +1,30 @@
+"""store show start times and next_show_at as timestamptz
+
+Revision ID: 0ba222f059d9
+Revises: 56c808e6aa9b
+Create Date: 2026-10-18 19:24:51.603218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0ba222f059d9'
+down_revision = '56c808e6aa9b'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (('shows', 'start_time', False), ('venues', 'next_show_at', True), ('artists', 'next_show_at', True))
+
+
+def upgrade():
+    # Existing values are wall-clock times; the cast reads them in the
+    # session time zone, which the app sets to TIMEZONE (config.py).
+    for table, column, nullable in COLUMNS:
+        op.alter_column(table, column, type_=sa.DateTime(timezone=True), existing_type=sa.DateTime(), existing_nullable=nullable, postgresql_using=f'{column}::timestamptz')
+
+
+def downgrade():
+    for table, column, nullable in COLUMNS:
+        op.alter_column(table, column, type_=sa.DateTime(), existing_type=sa.DateTime(timezone=True), existing_nullable=nullable, postgresql_using=f'{column}::timestamp')
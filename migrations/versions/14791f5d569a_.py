@@ -0,0 +1,40 @@
+"""add show counters and next_show_at to venues and artists
+
+Revision ID: 14791f5d569a
+Revises: ff94aa419c83
+Create Date: 2026-10-18 16:21:09.334512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '14791f5d569a'
+down_revision = 'ff94aa419c83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, owner in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(), nullable=True))
+        op.create_index(f'ix_{table}_next_show_at', table, ['next_show_at'], unique=False)
+
+        # Same backfill as `flask reconcile-counters --fix`.
+        op.execute(f"""
+            UPDATE {table} SET
+                upcoming_shows_count = (SELECT count(*) FROM shows WHERE shows.{owner} = {table}.id AND start_time > localtimestamp),
+                past_shows_count = (SELECT count(*) FROM shows WHERE shows.{owner} = {table}.id AND start_time <= localtimestamp),
+                next_show_at = (SELECT min(start_time) FROM shows WHERE shows.{owner} = {table}.id AND start_time > localtimestamp)
+        """)
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        op.drop_index(f'ix_{table}_next_show_at', table_name=table)
+        op.drop_column(table, 'next_show_at')
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
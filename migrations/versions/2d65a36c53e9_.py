@@ -0,0 +1,37 @@
+"""add shows.end_time and exclusion constraints against double bookings
+
+Revision ID: 2d65a36c53e9
+Revises: 83827c830657
+Create Date: 2026-10-18 21:32:44.570126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d65a36c53e9'
+down_revision = '83827c830657'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing shows book their venue and artist for models.SHOW_LENGTH.
+    op.add_column('shows', sa.Column('end_time', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE shows SET end_time = start_time + interval '3 hours'")
+    op.alter_column('shows', 'end_time', nullable=False)
+
+    # Fails, naming the two shows, if a venue or artist is already double
+    # booked; move or delete one of them and run the upgrade again.
+    for owner in ('venue', 'artist'):
+        op.execute(
+            f'ALTER TABLE shows ADD CONSTRAINT shows_{owner}_booking_excl EXCLUDE USING gist '
+            f"(int4range({owner}_id, {owner}_id, '[]') WITH =, tstzrange(start_time, end_time) WITH &&)"
+        )
+
+
+def downgrade():
+    for owner in ('artist', 'venue'):
+        op.drop_constraint(f'shows_{owner}_booking_excl', 'shows')
+    op.drop_column('shows', 'end_time')
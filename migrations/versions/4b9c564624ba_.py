@@ -0,0 +1,27 @@
+"""add case-folded name prefix indexes for autocomplete
+
+Revision ID: 4b9c564624ba
+Revises: 2d65a36c53e9
+Create Date: 2026-10-18 22:14:03.518207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b9c564624ba'
+down_revision = '2d65a36c53e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # models.name_key: in the "C" collation the index serves LIKE 'prefix%'.
+    for table in ('venues', 'artists'):
+        op.create_index(f'ix_{table}_name_key_id', table, [sa.text('(lower(name) COLLATE "C")'), 'id'], unique=False)
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        op.drop_index(f'ix_{table}_name_key_id', table_name=table)
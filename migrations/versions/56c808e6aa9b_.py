@@ -0,0 +1,31 @@
+"""add venue_areas materialized view for the venues directory
+
+Revision ID: 56c808e6aa9b
+Revises: 14791f5d569a
+Create Date: 2026-10-18 18:52:40.117693
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '56c808e6aa9b'
+down_revision = '14791f5d569a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE MATERIALIZED VIEW venue_areas AS
+        SELECT state, city, name, id, upcoming_shows_count AS num_upcoming_shows
+        FROM venues
+    """)
+    # Unique, so the view can be refreshed CONCURRENTLY; also serves the
+    # keyset pages of the directory.
+    op.execute('CREATE UNIQUE INDEX ix_venue_areas_state_city_name_id ON venue_areas (state, city, name, id)')
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW venue_areas')
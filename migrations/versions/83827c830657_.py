@@ -0,0 +1,86 @@
+"""move genres into a genres table and store venue/artist genres as smallint codes
+
+Revision ID: 83827c830657
+Revises: 8defdc918a73
+Create Date: 2026-10-18 20:41:17.085342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '83827c830657'
+down_revision = '8defdc918a73'
+branch_labels = None
+depends_on = None
+
+# models.GENRES as of this revision; a genre's code is its position + 1.
+GENRES = (
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+    'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+    'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other',
+)
+OTHER = GENRES.index('Other') + 1
+
+SEARCH_VECTOR_UPDATE = """
+    CREATE OR REPLACE FUNCTION search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce({genres}, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def _swap_genres(table, type_, values):
+    # Rebuilds {table}.genres from `values` without firing the search
+    # vector trigger: the genre names, and so the vector, do not change.
+    op.execute(f'ALTER TABLE {table} DISABLE TRIGGER {table}_search_vector_update')
+    op.add_column(table, sa.Column('new_genres', type_, nullable=True))
+    op.execute(f'UPDATE {table} SET new_genres = {values}')
+    op.drop_index(f'ix_{table}_genres', table_name=table)
+    op.drop_column(table, 'genres')
+    op.alter_column(table, 'new_genres', new_column_name='genres', nullable=False)
+    op.create_index(f'ix_{table}_genres', table, ['genres'], unique=False, postgresql_using='gin')
+    op.execute(f'ALTER TABLE {table} ENABLE TRIGGER {table}_search_vector_update')
+
+
+def upgrade():
+    genres = op.create_table(
+        'genres',
+        sa.Column('id', sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.bulk_insert(genres, [{'id': code, 'name': name} for code, name in enumerate(GENRES, 1)])
+
+    # Names outside the form choices can only have come from outside the
+    # app; they become 'Other'. Order is kept, duplicates are dropped.
+    for table in ('venues', 'artists'):
+        _swap_genres(table, sa.ARRAY(sa.SmallInteger()), f"""ARRAY(
+            SELECT coalesce(g.id, {OTHER})
+            FROM unnest({table}.genres) WITH ORDINALITY AS listed(name, position)
+            LEFT JOIN genres g ON g.name = listed.name
+            GROUP BY 1 ORDER BY min(listed.position)
+        )""")
+
+    op.execute(SEARCH_VECTOR_UPDATE.format(genres="(SELECT string_agg(name, ' ') FROM genres WHERE id = ANY(NEW.genres))"))
+
+
+def downgrade():
+    op.execute(SEARCH_VECTOR_UPDATE.format(genres="array_to_string(NEW.genres, ' ')"))
+
+    for table in ('venues', 'artists'):
+        _swap_genres(table, sa.ARRAY(sa.String()), f"""ARRAY(
+            SELECT g.name
+            FROM unnest({table}.genres) WITH ORDINALITY AS listed(id, position)
+            JOIN genres g ON g.id = listed.id
+            ORDER BY listed.position
+        )""")
+
+    op.drop_table('genres')
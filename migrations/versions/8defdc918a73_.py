@@ -0,0 +1,28 @@
+"""add genre GIN indexes and an artist location index for discovery
+
+Revision ID: 8defdc918a73
+Revises: 0ba222f059d9
+Create Date: 2026-10-18 19:58:06.412930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8defdc918a73'
+down_revision = '0ba222f059d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_venues_genres', 'venues', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_artists_genres', 'artists', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_artists_state_city_name_id', 'artists', ['state', 'city', 'name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artists_state_city_name_id', table_name='artists')
+    op.drop_index('ix_artists_genres', table_name='artists')
+    op.drop_index('ix_venues_genres', table_name='venues')
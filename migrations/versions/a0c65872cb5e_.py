@@ -0,0 +1,54 @@
+"""add weighted search vectors to venues and artists
+
+Revision ID: a0c65872cb5e
+Revises: ca21e66407be
+Create Date: 2026-10-18 11:40:02.518304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'a0c65872cb5e'
+down_revision = 'ca21e66407be'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venues', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.add_column('artists', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # array_to_string is not immutable, so the vector cannot be a generated
+    # column; keep it current with a trigger shared by both tables instead.
+    op.execute("""
+        CREATE FUNCTION search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(array_to_string(NEW.genres, ' '), '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ('venues', 'artists'):
+        op.execute(
+            f'CREATE TRIGGER {table}_search_vector_update BEFORE INSERT OR UPDATE '
+            f'ON {table} FOR EACH ROW EXECUTE FUNCTION search_vector_update()'
+        )
+        op.execute(f'UPDATE {table} SET name = name')
+
+    op.create_index('ix_venues_search_vector', 'venues', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_artists_search_vector', 'artists', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_artists_search_vector', table_name='artists')
+    op.drop_index('ix_venues_search_vector', table_name='venues')
+    for table in ('venues', 'artists'):
+        op.execute(f'DROP TRIGGER {table}_search_vector_update ON {table}')
+    op.execute('DROP FUNCTION search_vector_update()')
+    op.drop_column('artists', 'search_vector')
+    op.drop_column('venues', 'search_vector')
@@ -0,0 +1,96 @@
+"""add a show change log for incremental calendar sync
+
+Revision ID: b0136359f3dc
+Revises: 4b9c564624ba
+Create Date: 2026-10-18 23:02:51.730644
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b0136359f3dc'
+down_revision = '4b9c564624ba'
+branch_labels = None
+depends_on = None
+
+# Statement-level triggers: a COPY or multi-row INSERT of N shows logs
+# them with one INSERT ... SELECT from the transition table.
+SHOW_CHANGES_LOG = """
+    CREATE FUNCTION show_changes_log() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO show_changes (show_id) SELECT id FROM old_rows;
+        ELSE
+            INSERT INTO show_changes (show_id) SELECT id FROM new_rows;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+# A calendar entry shows the venue's name and address and the artist's
+# name, so changing those changes every show of the venue or artist.
+# The counter refreshes that also update these tables log nothing.
+OWNER_CHANGES_LOG = """
+    CREATE FUNCTION show_changes_log_{table}() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO show_changes (show_id)
+        SELECT shows.id
+        FROM new_rows
+        JOIN old_rows ON old_rows.id = new_rows.id
+        JOIN shows ON shows.{owner}_id = new_rows.id
+        WHERE ({columns}) IS DISTINCT FROM ({old_columns});
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+OWNERS = {
+    'venues': ('venue', ('name', 'address', 'city', 'state')),
+    'artists': ('artist', ('name',)),
+}
+
+
+def upgrade():
+    op.create_table(
+        'show_changes',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('show_id', sa.Integer(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_show_changes_txid_show_id', 'show_changes', ['txid', 'show_id'], unique=False)
+
+    op.execute(SHOW_CHANGES_LOG)
+    for event, tables in (('INSERT', 'NEW TABLE AS new_rows'), ('UPDATE', 'NEW TABLE AS new_rows'), ('DELETE', 'OLD TABLE AS old_rows')):
+        op.execute(
+            f'CREATE TRIGGER shows_changes_log_{event.lower()} AFTER {event} ON shows '
+            f'REFERENCING {tables} FOR EACH STATEMENT EXECUTE FUNCTION show_changes_log()'
+        )
+
+    for table, (owner, columns) in OWNERS.items():
+        op.execute(OWNER_CHANGES_LOG.format(
+            table=table,
+            owner=owner,
+            columns=', '.join(f'new_rows.{column}' for column in columns),
+            old_columns=', '.join(f'old_rows.{column}' for column in columns),
+        ))
+        op.execute(
+            f'CREATE TRIGGER {table}_show_changes_log AFTER UPDATE ON {table} '
+            f'REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION show_changes_log_{table}()'
+        )
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        op.execute(f'DROP TRIGGER {table}_show_changes_log ON {table}')
+        op.execute(f'DROP FUNCTION show_changes_log_{table}()')
+    for event in ('delete', 'update', 'insert'):
+        op.execute(f'DROP TRIGGER shows_changes_log_{event} ON shows')
+    op.execute('DROP FUNCTION show_changes_log()')
+    op.drop_index('ix_show_changes_txid_show_id', table_name='show_changes')
+    op.drop_table('show_changes')
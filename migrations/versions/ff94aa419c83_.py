@@ -0,0 +1,27 @@
+"""add updated_at to venues, artists and shows
+
+Revision ID: ff94aa419c83
+Revises: a0c65872cb5e
+Create Date: 2026-10-18 14:03:27.880145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ff94aa419c83'
+down_revision = 'a0c65872cb5e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venues', 'artists', 'shows'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")))
+        op.alter_column(table, 'updated_at', server_default=None)
+
+
+def downgrade():
+    for table in ('shows', 'artists', 'venues'):
+        op.drop_column(table, 'updated_at')
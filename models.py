@@ -0,0 +1,275 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR, ExcludeConstraint
+from sqlalchemy.types import SmallInteger, TypeDecorator
+
+import clock
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+# The values an Integer column, and so an id, can hold. Larger ones must be
+# turned away before they reach Postgres, which rejects them with an error.
+INT4 = range(-(2**31), 2**31)
+
+# ----------------------------------------------------------------------------#
+# Genres.
+# ----------------------------------------------------------------------------#
+
+# The genre choices of the venue and artist forms, coded 1, 2, ... in this
+# order. The codes are the ids of the genres table and are what
+# venues.genres and artists.genres hold, so only ever append to this list.
+GENRES = (
+    "Alternative",
+    "Blues",
+    "Classical",
+    "Country",
+    "Electronic",
+    "Folk",
+    "Funk",
+    "Hip-Hop",
+    "Heavy Metal",
+    "Instrumental",
+    "Jazz",
+    "Musical Theatre",
+    "Pop",
+    "Punk",
+    "R&B",
+    "Reggae",
+    "Rock n Roll",
+    "Soul",
+    "Other",
+)
+GENRE_CODES = {name: code for code, name in enumerate(GENRES, 1)}
+
+
+class GenreArray(TypeDecorator):
+    # A list of genre names in Python, a smallint[] of genre codes in the
+    # database. Bound values are cast, so `genres @> ...` compares arrays
+    # of the same type and can use the GIN index.
+
+    impl = ARRAY(SmallInteger)
+    cache_ok = True
+
+    def bind_expression(self, bindvalue):
+        return db.cast(bindvalue, ARRAY(SmallInteger))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return [GENRE_CODES[name] for name in value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return [GENRES[code - 1] for code in value]
+
+
+class Genre(db.Model):
+    # Lookup table for the genre codes, so SQL (the search_vector trigger,
+    # facet counts) can name them.
+    __tablename__ = "genres"
+
+    id = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+
+
+# ----------------------------------------------------------------------------#
+# Bookings.
+# ----------------------------------------------------------------------------#
+
+# How long a show books its venue and artist when no end time is given.
+SHOW_LENGTH = timedelta(hours=3)
+
+
+def _default_end_time(context):
+    return context.get_current_parameters()["start_time"] + SHOW_LENGTH
+
+
+def booked_by(owner_id):
+    # A venue or artist id as a one-element range: ranges have GiST support
+    # for =, plain integers only with the btree_gist extension.
+    return db.func.int4range(owner_id, owner_id, db.literal_column("'[]'"))
+
+
+def booked_for(start_time, end_time):
+    return db.func.tstzrange(start_time, end_time)
+
+
+# ----------------------------------------------------------------------------#
+# Names.
+# ----------------------------------------------------------------------------#
+
+
+def name_key(name):
+    # The case-folded, byte-ordered name that autocomplete.py matches
+    # prefixes of. In the "C" collation LIKE 'prefix%' and ORDER BY can both
+    # use a plain btree index on it, and the order is Python's str order.
+    return db.func.lower(name).collate("C")
+
+
+# ----------------------------------------------------------------------------#
+# Models.
+# ----------------------------------------------------------------------------#
+
+
+class Show(db.Model):
+    __tablename__ = "shows"
+
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.ForeignKey("venues.id"))
+    artist_id = db.Column(db.ForeignKey("artists.id"))
+    start_time = db.Column(db.DateTime(timezone=True), nullable=False)
+    end_time = db.Column(
+        db.DateTime(timezone=True), nullable=False, default=_default_end_time
+    )
+    updated_at = db.Column(
+        db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    __table_args__ = (
+        db.Index("ix_shows_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_shows_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_shows_start_time_id", "start_time", "id"),
+        # Neither a venue nor an artist can have two overlapping shows. The
+        # GiST indexes behind these also serve scheduling.py's conflict
+        # checks.
+        ExcludeConstraint(
+            (booked_by(venue_id), "="),
+            (booked_for(start_time, end_time), "&&"),
+            name="shows_venue_booking_excl",
+            using="gist",
+        ),
+        ExcludeConstraint(
+            (booked_by(artist_id), "="),
+            (booked_for(start_time, end_time), "&&"),
+            name="shows_artist_booking_excl",
+            using="gist",
+        ),
+    )
+
+    @db.validates("start_time")
+    def validate_start_time(self, key, value):
+        # Form input is naive; counters.py compares it with clock.now().
+        return clock.aware(value)
+
+
+class Venue(db.Model):
+    __tablename__ = "venues"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    address = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    image_link = db.Column(db.String(500))
+    genres = db.Column(GenreArray, nullable=False)
+    facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(120))
+    # Maintained by the search_vector_update trigger, see migration a0c65872cb5e.
+    search_vector = db.deferred(db.Column(TSVECTOR))
+    updated_at = db.Column(
+        db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # Maintained by counters.py on every show write and moved from upcoming
+    # to past by `flask roll-over-shows`.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    next_show_at = db.Column(db.DateTime(timezone=True))
+    shows = db.relationship(
+        "Show",
+        backref="venue",
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        db.Index("ix_venues_state_city_name_id", "state", "city", "name", "id"),
+        db.Index(
+            "ix_venues_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        db.Index("ix_venues_search_vector", "search_vector", postgresql_using="gin"),
+        # Name prefix lookups of autocomplete.py.
+        db.Index("ix_venues_name_key_id", name_key(name), "id"),
+        db.Index("ix_venues_next_show_at", "next_show_at"),
+        # Genre filters of the discovery endpoints (genres @> ARRAY[codes]).
+        db.Index("ix_venues_genres", "genres", postgresql_using="gin"),
+    )
+
+
+class Artist(db.Model):
+    __tablename__ = "artists"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    image_link = db.Column(db.String(500))
+    genres = db.Column(GenreArray, nullable=False)
+    facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(120))
+    # Maintained by the search_vector_update trigger, see migration a0c65872cb5e.
+    search_vector = db.deferred(db.Column(TSVECTOR))
+    updated_at = db.Column(
+        db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # Maintained by counters.py on every show write and moved from upcoming
+    # to past by `flask roll-over-shows`.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    next_show_at = db.Column(db.DateTime(timezone=True))
+    shows = db.relationship(
+        "Show",
+        backref="artist",
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        db.Index("ix_artists_name_id", "name", "id"),
+        db.Index(
+            "ix_artists_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        db.Index("ix_artists_search_vector", "search_vector", postgresql_using="gin"),
+        # Name prefix lookups of autocomplete.py.
+        db.Index("ix_artists_name_key_id", name_key(name), "id"),
+        db.Index("ix_artists_next_show_at", "next_show_at"),
+        # Genre filters of the discovery endpoints (genres @> ARRAY[codes]).
+        db.Index("ix_artists_genres", "genres", postgresql_using="gin"),
+        db.Index("ix_artists_state_city_name_id", "state", "city", "name", "id"),
+    )
+
+
+class ShowChange(db.Model):
+    # One row per show written, and per show of a venue or artist whose
+    # calendar details changed, appended by the show_changes_log triggers
+    # (see migration b0136359f3dc). Deleted shows keep their rows, so
+    # there is no foreign key. calendars.py syncs subscribers from it.
+    __tablename__ = "show_changes"
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    show_id = db.Column(db.Integer, nullable=False)
+    # The writing transaction; see calendars.cursor.
+    txid = db.Column(
+        db.BigInteger,
+        nullable=False,
+        server_default=db.text("pg_current_xact_id()::text::bigint"),
+    )
+    changed_at = db.Column(
+        db.DateTime(timezone=True), nullable=False, server_default=db.func.now()
+    )
+
+    __table_args__ = (db.Index("ix_show_changes_txid_show_id", "txid", "show_id"),)
@@ -0,0 +1,129 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import threading
+import time
+import weakref
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+# ----------------------------------------------------------------------------#
+# Metrics.
+# ----------------------------------------------------------------------------#
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool that times how long each checkout waits for a free
+    # connection. Metrics survive pool.recreate() (engine.dispose()).
+
+    instances = weakref.WeakSet()
+
+    def __init__(self, *args, **kwargs):
+        self.metrics = kwargs.pop("metrics", None) or PoolMetrics()
+        super().__init__(*args, **kwargs)
+        InstrumentedQueuePool.instances.add(self)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def stats(self):
+        capacity = self.size() + self._max_overflow
+        metrics = self.metrics
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "saturation": self.checkedout() / capacity if capacity else 0.0,
+            "checkouts": metrics.checkouts,
+            "timeouts": metrics.timeouts,
+            "wait_seconds_total": metrics.wait_total,
+            "wait_seconds_max": metrics.wait_max,
+        }
+
+
+def pool_stats():
+    return [pool.stats() for pool in list(InstrumentedQueuePool.instances)]
+
+
+# ----------------------------------------------------------------------------#
+# Engine options.
+# ----------------------------------------------------------------------------#
+
+
+def engine_options(config):
+    # Builds SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings in config.py.
+    if config["DB_POOLER"] == "pgbouncer":
+        # pgbouncer already pools, and in transaction mode a client-side
+        # pool would pin server connections between transactions. The
+        # statement timeout and time zone are set on the role instead.
+        return {"poolclass": NullPool}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+    if config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+            f" -c timezone={config['TIMEZONE']}"
+        }
+    return options
+
+
+def async_engine_options(config):
+    # The same settings for the asyncpg engine used by asgi.py. Its pool has
+    # to be an asyncio-aware one, so checkout waits are not instrumented.
+    if config["DB_POOLER"] == "pgbouncer":
+        # asyncpg prepares every statement; a prepared statement does not
+        # survive pgbouncer handing the next transaction another server.
+        return {"poolclass": NullPool, "connect_args": {"statement_cache_size": 0}}
+
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        "connect_args": {
+            "server_settings": {
+                "statement_timeout": str(config["DB_STATEMENT_TIMEOUT_MS"]),
+                "timezone": config["TIMEZONE"],
+            }
+        },
+    }
@@ -0,0 +1,49 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import re
+
+from flask import current_app
+from sqlalchemy.dialects.postgresql import psycopg2
+
+# ----------------------------------------------------------------------------#
+# Prepared statements.
+# ----------------------------------------------------------------------------#
+
+
+class PreparedStatement:
+    # A SELECT with named bind parameters that is PREPAREd on each Postgres
+    # connection the first time it runs there and EXECUTEd from then on, so
+    # it is parsed and planned once per connection rather than per request.
+    # psycopg2 only has client-side parameters; asyncpg (asgi.py) prepares
+    # every statement by itself. Falls back to a plain execute when
+    # DB_PREPARED_STATEMENTS is off or the database is not Postgres.
+
+    def __init__(self, name, statement):
+        self.name = name
+        self.statement = statement
+        compiled = statement.compile(dialect=psycopg2.dialect())
+        self.keys = list(compiled.params)
+        positions = {key: f"${index}" for index, key in enumerate(self.keys, 1)}
+        sql = re.sub(
+            r"%\((\w+)\)s", lambda match: positions[match.group(1)], compiled.string
+        )
+        self.sql = f"PREPARE {name} AS {sql.replace('%%', '%')}"
+        self.execute_sql = f"EXECUTE {name}({', '.join(['%s'] * len(self.keys))})"
+
+    def execute(self, connection, **params):
+        if (
+            connection.dialect.name != "postgresql"
+            or not current_app.config["DB_PREPARED_STATEMENTS"]
+        ):
+            return connection.execute(self.statement, params)
+
+        # Connection.info lives as long as the DBAPI connection, and so do
+        # the statements prepared on it.
+        prepared = connection.info.setdefault("prepared_statements", set())
+        if self.name not in prepared:
+            connection.exec_driver_sql(self.sql)
+            prepared.add(self.name)
+        return connection.exec_driver_sql(
+            self.execute_sql, tuple(params[key] for key in self.keys)
+        )
@@ -0,0 +1,367 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Integer,
+    String,
+    bindparam,
+    func,
+    inspect,
+    select,
+    tuple_,
+)
+
+import clock
+from models import db, Venue, Artist, Show
+from prepared import PreparedStatement
+
+# ----------------------------------------------------------------------------#
+# Helpers.
+# ----------------------------------------------------------------------------#
+
+
+def _columns(instance):
+    # Loaded column attributes only, so deferred columns such as
+    # search_vector are not fetched just to be dropped.
+    state = inspect(instance)
+    return {
+        attr.key: getattr(instance, attr.key)
+        for attr in state.mapper.column_attrs
+        if attr.key not in state.unloaded
+    }
+
+
+Page = namedtuple("Page", ["items", "next_cursor", "prev_cursor"])
+
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class InvalidCursor(ValueError):
+    # A cursor that encode_cursor did not produce for these columns.
+    pass
+
+
+def _cursor_value(column, value):
+    # The key value for `column`, checked against its type (and, for
+    # integers, the column's range) so a bad cursor never reaches Postgres.
+    if isinstance(column.type, DateTime):
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    elif isinstance(column.type, Integer):
+        bits = 63 if isinstance(column.type, BigInteger) else 31
+        if type(value) is int and -(2**bits) <= value < 2**bits:
+            return value
+    elif isinstance(column.type, String):
+        if isinstance(value, str) and "\x00" not in value:
+            return value
+    raise InvalidCursor("invalid cursor")
+
+
+def decode_cursor(cursor, columns):
+    # Raises InvalidCursor for anything that was not produced by
+    # encode_cursor for `columns`.
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise InvalidCursor("invalid cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("invalid cursor")
+    return [_cursor_value(column, value) for column, value in zip(columns, values)]
+
+
+def keyset_page(query, columns, per_page, after=None, before=None):
+    # Seeks to the page after (or before) a cursor using a row comparison on
+    # `columns`, so the cost of a page does not depend on how deep it is.
+    # Rows must expose each column under its own key.
+    key = tuple_(*columns)
+    if before:
+        query = query.filter(key < tuple_(*decode_cursor(before, columns)))
+        query = query.order_by(*[column.desc() for column in columns])
+    else:
+        if after:
+            query = query.filter(key > tuple_(*decode_cursor(after, columns)))
+        query = query.order_by(*columns)
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor([getattr(row, column.key) for column in columns])
+
+    if before:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(after)
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = cursor_for(rows[-1])
+    if rows and has_prev:
+        prev_cursor = cursor_for(rows[0])
+    return Page(rows, next_cursor, prev_cursor)
+
+
+def load_page(listing, args, config):
+    # Reads keyset pagination arguments (?after=/?before= cursors and
+    # ?per_page=) and returns the requested page of `listing`. Raises
+    # InvalidCursor (a ValueError) for a malformed cursor.
+    per_page = args.get("per_page", config["PAGE_SIZE"], type=int)
+    per_page = max(1, min(per_page, config["MAX_PAGE_SIZE"]))
+    return listing(per_page, after=args.get("after"), before=args.get("before"))
+
+
+def _split_shows(rows, *fields):
+    # Partitions show rows into past and upcoming in one pass. Postgres
+    # decides which side each show is on (the `upcoming` column), against
+    # the request's clock.now().
+    upcoming_shows = []
+    past_shows = []
+    for row in rows:
+        details = {field: getattr(row, field) for field in fields}
+        details["start_time"] = row.start_time
+        if row.upcoming:
+            upcoming_shows.append(details)
+        else:
+            past_shows.append(details)
+
+    return {
+        "upcoming_shows_count": len(upcoming_shows),
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "past_shows": past_shows,
+    }
+
+
+# ----------------------------------------------------------------------------#
+# Venues.
+# ----------------------------------------------------------------------------#
+
+
+def venue_area_rows():
+    # One row per venue with its upcoming show count (the venue's maintained
+    # counter, see counters.py), in directory order.
+    return db.session.query(
+        Venue.state,
+        Venue.city,
+        Venue.name,
+        Venue.id,
+        Venue.upcoming_shows_count.label("num_upcoming_shows"),
+    )
+
+
+def group_areas(page):
+    # Folds a page of venue area rows into city/state -> venues.
+    areas = []
+    for (state, city), venues in groupby(
+        page.items, key=lambda row: (row.state, row.city)
+    ):
+        areas.append(
+            {
+                "state": state,
+                "city": city,
+                "venues": [
+                    {
+                        "id": venue.id,
+                        "name": venue.name,
+                        "num_upcoming_shows": venue.num_upcoming_shows,
+                    }
+                    for venue in venues
+                ],
+            }
+        )
+    return page._replace(items=areas)
+
+
+def venue_areas(per_page, after=None, before=None):
+    # Builds the city/state -> venues -> upcoming show count listing in a
+    # single query instead of one query per city plus one per venue.
+    # Pages are cut on (state, city, name, id) so areas stay contiguous.
+    page = keyset_page(
+        venue_area_rows(),
+        [Venue.state, Venue.city, Venue.name, Venue.id],
+        per_page,
+        after=after,
+        before=before,
+    )
+    return group_areas(page)
+
+
+# Shared with the async views in asgi.py, hence a select() rather than a
+# session query. The venue id and "now" are bind parameters, so the
+# statement text never changes and can be prepared.
+VENUE_SHOWS = (
+    select(
+        Show.start_time,
+        (Show.start_time > bindparam("now")).label("upcoming"),
+        Artist.id.label("artist_id"),
+        Artist.name.label("artist_name"),
+        Artist.image_link.label("artist_image_link"),
+    )
+    .join(Artist, Show.artist_id == Artist.id)
+    .where(Show.venue_id == bindparam("venue_id"))
+    .order_by(Show.start_time)
+)
+prepared_venue_shows = PreparedStatement("fyyur_venue_shows", VENUE_SHOWS)
+
+
+def venue_shows(venue_id, now):
+    return VENUE_SHOWS.params(venue_id=venue_id, now=now)
+
+
+def venue_payload(venue, rows):
+    data = _columns(venue)
+    data.update(_split_shows(rows, "artist_id", "artist_name", "artist_image_link"))
+    return data
+
+
+def venue_detail(venue_id):
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return None
+    connection = db.session.connection(bind_arguments={"mapper": inspect(Show)})
+    rows = prepared_venue_shows.execute(
+        connection, venue_id=venue_id, now=clock.now()
+    ).all()
+    return venue_payload(venue, rows)
+
+
+def venue_ids_for_artist(artist_id):
+    # Venues whose detail page lists a show by this artist.
+    rows = (
+        db.session.query(Show.venue_id)
+        .filter(Show.artist_id == artist_id)
+        .distinct()
+        .all()
+    )
+    return [row.venue_id for row in rows]
+
+
+# ----------------------------------------------------------------------------#
+# Artists.
+# ----------------------------------------------------------------------------#
+
+
+def artist_listing(per_page, after=None, before=None):
+    query = db.session.query(Artist.name, Artist.id, Artist.upcoming_shows_count)
+    page = keyset_page(
+        query, [Artist.name, Artist.id], per_page, after=after, before=before
+    )
+    return page._replace(
+        items=[
+            {
+                "id": row.id,
+                "name": row.name,
+                "num_upcoming_shows": row.upcoming_shows_count,
+            }
+            for row in page.items
+        ]
+    )
+
+
+ARTIST_SHOWS = (
+    select(
+        Show.start_time,
+        (Show.start_time > bindparam("now")).label("upcoming"),
+        Venue.id.label("venue_id"),
+        Venue.name.label("venue_name"),
+        Venue.image_link.label("venue_image_link"),
+    )
+    .join(Venue, Show.venue_id == Venue.id)
+    .where(Show.artist_id == bindparam("artist_id"))
+    .order_by(Show.start_time)
+)
+prepared_artist_shows = PreparedStatement("fyyur_artist_shows", ARTIST_SHOWS)
+
+
+def artist_shows(artist_id, now):
+    return ARTIST_SHOWS.params(artist_id=artist_id, now=now)
+
+
+def artist_payload(artist, rows):
+    data = _columns(artist)
+    data.update(_split_shows(rows, "venue_id", "venue_name", "venue_image_link"))
+    return data
+
+
+def artist_detail(artist_id):
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return None
+    connection = db.session.connection(bind_arguments={"mapper": inspect(Show)})
+    rows = prepared_artist_shows.execute(
+        connection, artist_id=artist_id, now=clock.now()
+    ).all()
+    return artist_payload(artist, rows)
+
+
+def artist_ids_for_venue(venue_id):
+    # Artists whose detail page lists a show at this venue.
+    rows = (
+        db.session.query(Show.artist_id)
+        .filter(Show.venue_id == venue_id)
+        .distinct()
+        .all()
+    )
+    return [row.artist_id for row in rows]
+
+
+# ----------------------------------------------------------------------------#
+# Shows.
+# ----------------------------------------------------------------------------#
+
+
+def show_listing(per_page, after=None, before=None):
+    query = (
+        db.session.query(
+            Show.start_time,
+            Show.id,
+            Venue.id.label("venue_id"),
+            Venue.name.label("venue_name"),
+            Artist.id.label("artist_id"),
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+            # Latest change to the show, its venue or its artist; the show
+            # tile's fragment cache key.
+            func.greatest(Show.updated_at, Venue.updated_at, Artist.updated_at).label(
+                "updated_at"
+            ),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+    )
+    page = keyset_page(
+        query, [Show.start_time, Show.id], per_page, after=after, before=before
+    )
+
+    shows = []
+    for row in page.items:
+        shows.append(
+            {
+                "id": row.id,
+                "venue_id": row.venue_id,
+                "venue_name": row.venue_name,
+                "artist_id": row.artist_id,
+                "artist_name": row.artist_name,
+                "artist_image_link": row.artist_image_link,
+                "start_time": row.start_time,
+                "updated_at": row.updated_at,
+            }
+        )
+    return page._replace(items=shows)
@@ -0,0 +1,288 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import functools
+import gzip
+import hashlib
+import os
+
+from flask import Response, g, request, session
+
+from cache import LRUBackend
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# ----------------------------------------------------------------------------#
+# Policies.
+# ----------------------------------------------------------------------------#
+
+
+def cache_policy(**directives):
+    # Cache-Control for a view's successful responses, as werkzeug
+    # ResponseCacheControl attributes, e.g.
+    # @cache_policy(public=True, max_age=0, s_maxage=30). A public policy
+    # with a shared max age also lets the response cache below keep it.
+    # The policy is also left on the view for asgi.py.
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.cache_policy = directives
+            return view(*args, **kwargs)
+
+        wrapper.cache_policy = directives
+        return wrapper
+
+    return decorator
+
+
+def _shared_max_age(response):
+    cache_control = response.cache_control
+    if not cache_control.public or cache_control.no_store or cache_control.no_cache:
+        return 0
+    # werkzeug parses max-age but leaves s-maxage as a string.
+    return int(cache_control.s_maxage or cache_control.max_age or 0)
+
+
+# ----------------------------------------------------------------------------#
+# Static files.
+# ----------------------------------------------------------------------------#
+
+
+@functools.lru_cache(maxsize=1024)
+def _file_hash(path, mtime):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def static_version(app, filename):
+    path = os.path.join(app.static_folder, filename)
+    try:
+        return _file_hash(path, os.path.getmtime(path))
+    except OSError:
+        return None
+
+
+# ----------------------------------------------------------------------------#
+# Compression.
+# ----------------------------------------------------------------------------#
+
+
+def negotiate_encoding(accept_encoding):
+    if brotli is not None and accept_encoding["br"]:
+        return "br"
+    if accept_encoding["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level)
+
+
+# ----------------------------------------------------------------------------#
+# Shared response cache.
+# ----------------------------------------------------------------------------#
+
+
+class ResponseCache:
+    # Whole responses to anonymous GETs, kept for their shared max age. As
+    # in an HTTP cache, the first entry for a URL records the request
+    # headers its response varies on, and the stored variants are keyed on
+    # the values of those headers. Accept-Encoding is reduced to the
+    # encoding that was negotiated.
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def _variant_key(self, vary):
+        values = []
+        for header in vary:
+            if header == "accept-encoding":
+                values.append(negotiate_encoding(request.accept_encodings) or "")
+            else:
+                values.append(request.headers.get(header, ""))
+        return request.full_path + "|" + "|".join(values)
+
+    def get(self):
+        vary = self.backend.get("vary:" + request.full_path)
+        entry = None if vary is None else self.backend.get(self._variant_key(vary))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        status, headers, body = entry
+        return Response(body, status=status, headers=headers)
+
+    def set(self, response, ttl):
+        vary = sorted(header.lower() for header in response.vary)
+        if "*" in vary:
+            return
+        self.backend.set("vary:" + request.full_path, vary, ttl)
+        self.backend.set(
+            self._variant_key(vary),
+            (response.status_code, list(response.headers), response.get_data()),
+            ttl,
+        )
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# ----------------------------------------------------------------------------#
+# Extension.
+# ----------------------------------------------------------------------------#
+
+
+class HttpCaching:
+    # Applies @cache_policy headers, serves content-hashed static URLs
+    # (?v=<hash>) with far-future caching, compresses bodies of at least
+    # COMPRESS_MIN_SIZE bytes with brotli or gzip, and keeps a shared cache
+    # of public responses for requests that carry no cookies.
+
+    def __init__(self, app=None):
+        self.app = None
+        self.min_size = None
+        self.level = None
+        self.static_max_age = None
+        self.response_cache = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._compressed_static = LRUBackend(max_size=256, ttl=86400)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.config.setdefault("STATIC_MAX_AGE", 365 * 24 * 3600)
+        app.config.setdefault("RESPONSE_CACHE_SIZE", 256)
+
+        self.app = app
+        self.min_size = app.config["COMPRESS_MIN_SIZE"]
+        self.level = app.config["COMPRESS_LEVEL"]
+        self.static_max_age = app.config["STATIC_MAX_AGE"]
+        self.response_cache = ResponseCache(
+            LRUBackend(app.config["RESPONSE_CACHE_SIZE"])
+        )
+
+        app.url_defaults(self._version_static_urls)
+        app.before_request(self._serve_cached)
+        app.after_request(self._finish_response)
+
+    def _version_static_urls(self, endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            version = static_version(self.app, values["filename"])
+            if version is not None:
+                values["v"] = version
+
+    def _anonymous_get(self):
+        return request.method == "GET" and "Cookie" not in request.headers
+
+    def _serve_cached(self):
+        if not self._anonymous_get():
+            return None
+        response = self.response_cache.get()
+        if response is not None:
+            g.response_cached = True
+            return response.make_conditional(request)
+        return None
+
+    def _finish_response(self, response):
+        if g.pop("response_cached", False):
+            return response
+
+        policy = g.pop("cache_policy", None)
+        if policy and response.status_code == 200:
+            for directive, value in policy.items():
+                setattr(response.cache_control, directive, value)
+        if request.endpoint == "static" and response.status_code in (200, 304):
+            filename = request.view_args["filename"]
+            if request.args.get("v") == static_version(self.app, filename):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = self.static_max_age
+                response.cache_control.immutable = True
+
+        self._compress(response)
+
+        max_age = _shared_max_age(response)
+        if (
+            max_age
+            and response.status_code == 200
+            and self._anonymous_get()
+            and not session.modified
+            and "Set-Cookie" not in response.headers
+        ):
+            self.response_cache.set(response, max_age)
+        return response
+
+    def _compress(self, response):
+        if (
+            response.status_code != 200
+            or (response.is_streamed and request.endpoint != "static")
+            or "Content-Encoding" in response.headers
+            or "Content-Range" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE)
+        ):
+            return
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return
+
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return
+
+        # Static files are the same bytes on every request, so their
+        # compressed form is kept by path and modification time.
+        etag, _ = response.get_etag()
+        key = None
+        if request.endpoint == "static":
+            key = f"{request.path}:{response.last_modified}:{encoding}"
+        body = self._compressed_static.get(key) if key else None
+        if body is None:
+            body = compress(data, encoding, self.level)
+            if key:
+                self._compressed_static.set(key, body)
+        self.bytes_in += len(data)
+        self.bytes_out += len(body)
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            # The encoded body is a different representation; a weak ETag
+            # still validates it against the uncompressed one.
+            response.set_etag(etag, weak=True)
+
+    def stats(self):
+        stats = {
+            f"response_cache_{k}": v for k, v in self.response_cache.stats().items()
+        }
+        stats["compress_bytes_in"] = self.bytes_in
+        stats["compress_bytes_out"] = self.bytes_out
+        return stats
@@ -0,0 +1,149 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import functools
+import itertools
+import threading
+import time
+
+from flask import g, has_request_context, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import create_engine, event, orm
+
+_lock = threading.Lock()
+
+# ----------------------------------------------------------------------------#
+# Views.
+# ----------------------------------------------------------------------------#
+
+
+def read_only(view):
+    # Marks a view as safe to serve from a read replica. The mark is also
+    # left on the view for asgi.py, which awaits its own coroutine instead.
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+
+    wrapper.read_only = True
+    return wrapper
+
+
+def on_primary(func):
+    # Runs `func` against the primary even inside a @read_only view. For
+    # loaders that fill a cache shared with other requests: a lagging
+    # replica would put back data that a write has just invalidated.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        read_only = g.get("db_read_only")
+        g.db_read_only = False
+        try:
+            return func(*args, **kwargs)
+        finally:
+            g.db_read_only = read_only
+
+    return wrapper
+
+
+def _recently_wrote(app):
+    # Read-your-writes: a client that committed a write within the last
+    # DB_REPLICA_STICKY_SECONDS keeps reading from the primary, so it does
+    # not see a replica that has not caught up yet.
+    last_write = session.get("db_last_write_at")
+    return (
+        last_write is not None
+        and time.time() - last_write < app.config["DB_REPLICA_STICKY_SECONDS"]
+    )
+
+
+# ----------------------------------------------------------------------------#
+# Session.
+# ----------------------------------------------------------------------------#
+
+
+class RoutingSession(SignallingSession):
+    # Sends reads made by @read_only views to one replica, chosen once per
+    # request so every statement sees the same snapshot. Flushes, writes
+    # and every other view stay on the primary.
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or not has_request_context() or not g.get("db_read_only"):
+            return super().get_bind(mapper, clause)
+
+        replica = g.get("db_replica")
+        if replica is None:
+            if _recently_wrote(self.app):
+                replica = False
+            else:
+                replica = get_state(self.app).db.choose_replica(self.app) or False
+            g.db_replica = replica
+        return replica or super().get_bind(mapper, clause)
+
+
+def _record_write(db_session, flush_context, instances):
+    if has_request_context() and (
+        db_session.new or db_session.dirty or db_session.deleted
+    ):
+        g.db_wrote = True
+
+
+def _record_statement_write(orm_execute_state):
+    # Core INSERT, UPDATE and DELETE statements run through the session
+    # (bulk inserts, counter updates) write without flushing any object.
+    if has_request_context() and (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        g.db_wrote = True
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def init_app(self, app):
+        app.config.setdefault("SQLALCHEMY_REPLICA_URIS", [])
+        app.config.setdefault("DB_REPLICA_SELECTION", "round_robin")
+        app.config.setdefault("DB_REPLICA_STICKY_SECONDS", 5)
+        super().init_app(app)
+
+        @app.after_request
+        def remember_write(response):
+            if g.pop("db_wrote", False):
+                session["db_last_write_at"] = time.time()
+            return response
+
+    def create_session(self, options):
+        factory = orm.sessionmaker(class_=RoutingSession, db=self, **options)
+        event.listen(factory, "before_flush", _record_write)
+        event.listen(factory, "do_orm_execute", _record_statement_write)
+        return factory
+
+    def replica_engines(self, app):
+        state = get_state(app)
+        with _lock:
+            replicas = getattr(state, "replicas", None)
+            if replicas is None:
+                options = dict(app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+                engines = [
+                    create_engine(uri, **options)
+                    for uri in app.config["SQLALCHEMY_REPLICA_URIS"]
+                ]
+                replicas = state.replicas = (engines, itertools.cycle(engines))
+        return replicas
+
+    def choose_replica(self, app):
+        engines, rotation = self.replica_engines(app)
+        if not engines:
+            return None
+        if app.config["DB_REPLICA_SELECTION"] == "least_connections":
+            return min(engines, key=_checked_out)
+        with _lock:
+            return next(rotation)
+
+    def dispose_replicas(self, app, close=True):
+        for engine in self.replica_engines(app)[0]:
+            engine.dispose(close=close)
+
+
+def _checked_out(engine):
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
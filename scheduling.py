@@ -0,0 +1,207 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+from datetime import datetime
+
+import dateutil.parser
+from sqlalchemy import (
+    Integer,
+    any_,
+    bindparam,
+    exc,
+    func,
+    insert,
+    literal,
+    null,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TIMESTAMP
+
+import clock
+import counters
+from models import (
+    db,
+    INT4,
+    SHOW_LENGTH,
+    Venue,
+    Artist,
+    Show,
+    booked_by,
+    booked_for,
+)
+
+# Show columns naming what a show books, with the name used in errors.
+OWNERS = {"venue_id": "venue", "artist_id": "artist"}
+
+# SQLSTATE of a row rejected by an EXCLUDE constraint.
+EXCLUSION_VIOLATION = "23P01"
+
+# ----------------------------------------------------------------------------#
+# Parsing.
+# ----------------------------------------------------------------------------#
+
+
+def parse_show(item):
+    # Reads one requested show, {"artist_id", "venue_id", "start_time" and
+    # optionally "end_time"} with ISO 8601 (or datetime) times. Returns
+    # (values, errors); naive times are in the app's TIMEZONE.
+    if not isinstance(item, dict):
+        return None, {"show": "must be an object"}
+    values = {}
+    errors = {}
+    for key in ("artist_id", "venue_id"):
+        value = item.get(key)
+        if isinstance(value, bool) or not isinstance(value, int) or value not in INT4:
+            errors[key] = "must be an integer"
+        values[key] = value
+    for key in ("start_time", "end_time"):
+        value = item.get(key)
+        if value is None and key == "end_time":
+            continue
+        try:
+            if not isinstance(value, datetime):
+                value = dateutil.parser.isoparse(value)
+        except (TypeError, ValueError):
+            errors[key] = "must be an ISO 8601 date and time"
+        else:
+            values[key] = clock.aware(value)
+    if "start_time" in values:
+        values.setdefault("end_time", values["start_time"] + SHOW_LENGTH)
+        if "end_time" in values and values["end_time"] <= values["start_time"]:
+            errors["end_time"] = "must be after start_time"
+    return values, errors
+
+
+# ----------------------------------------------------------------------------#
+# Checks.
+# ----------------------------------------------------------------------------#
+
+
+def _existing_ids(rows):
+    # Every venue and artist id the batch refers to, resolved in one round
+    # trip. ANY(array) keeps the statement the same for any batch size.
+    def ids(model, key):
+        wanted = sorted({values[key] for _, values in rows})
+        return (
+            select(func.coalesce(func.array_agg(model.id), []))
+            .where(model.id == any_(bindparam(key, wanted, type_=ARRAY(Integer))))
+            .scalar_subquery()
+        )
+
+    venue_ids, artist_ids = db.session.execute(
+        select(ids(Venue, "venue_id"), ids(Artist, "artist_id"))
+    ).one()
+    return {"venue_id": set(venue_ids), "artist_id": set(artist_ids)}
+
+
+def conflicts(rows):
+    # Rows (index, owner key, show id or None, other index or None) for
+    # every requested show whose venue or artist is already booked during
+    # it, or is booked by another show of the batch. One statement: the
+    # batch is unnested into a CTE and range-joined against shows through
+    # the GiST indexes of the booking exclusion constraints.
+    columns = {
+        "index": Integer,
+        "venue_id": Integer,
+        "artist_id": Integer,
+        "start_time": TIMESTAMP(timezone=True),
+        "end_time": TIMESTAMP(timezone=True),
+    }
+    arrays = [
+        bindparam(
+            f"batch_{name}",
+            [index if name == "index" else values[name] for index, values in rows],
+            type_=ARRAY(type_),
+        )
+        for name, type_ in columns.items()
+    ]
+    batch = select(
+        func.unnest(*arrays).table_valued(*columns).render_derived(name="unnested")
+    ).cte("batch")
+    other = batch.alias("other")
+
+    checks = []
+    for key in OWNERS:
+        checks.append(
+            select(batch.c.index, literal(key), Show.id, null()).join(
+                Show,
+                (booked_by(Show.__table__.c[key]) == booked_by(batch.c[key]))
+                & booked_for(Show.start_time, Show.end_time).op("&&")(
+                    booked_for(batch.c.start_time, batch.c.end_time)
+                ),
+            )
+        )
+        checks.append(
+            select(batch.c.index, literal(key), null(), other.c.index).join(
+                other,
+                (other.c[key] == batch.c[key])
+                & (other.c.index < batch.c.index)
+                & booked_for(other.c.start_time, other.c.end_time).op("&&")(
+                    booked_for(batch.c.start_time, batch.c.end_time)
+                ),
+            )
+        )
+    return db.session.execute(union_all(*checks)).all()
+
+
+# ----------------------------------------------------------------------------#
+# Scheduling.
+# ----------------------------------------------------------------------------#
+
+
+def schedule(items):
+    # Validates and books a batch of shows (see parse_show) in one
+    # transaction: all of them or, if any is invalid, none. Returns (ids,
+    # errors): the new show ids in request order, or a list of
+    # {"index", "errors": {field: message}} for the shows that failed.
+    rows = []
+    errors = {}
+    for index, item in enumerate(items):
+        values, row_errors = parse_show(item)
+        if row_errors:
+            errors[index] = row_errors
+        else:
+            rows.append((index, values))
+
+    if rows:
+        existing = _existing_ids(rows)
+        for index, values in rows:
+            for key, owner in OWNERS.items():
+                if values[key] not in existing[key]:
+                    errors.setdefault(index, {})[key] = f"no {owner} {values[key]}"
+        for index, key, show_id, other_index in conflicts(rows):
+            if show_id is not None:
+                message = f"{OWNERS[key]} is booked by show {show_id}"
+            else:
+                message = f"{OWNERS[key]} is booked by show #{other_index} of the batch"
+            errors.setdefault(index, {}).setdefault(key, message)
+
+    if errors or not rows:
+        db.session.rollback()
+        return [], [{"index": i, "errors": errors[i]} for i in sorted(errors)]
+
+    values = [values for _, values in rows]
+    try:
+        inserted = db.session.execute(
+            insert(Show)
+            .values(values)
+            .returning(Show.id, Show.venue_id, Show.start_time)
+        )
+        # RETURNING rows come in no guaranteed order. The exclusion
+        # constraints let a venue start only one show at a time, so
+        # (venue_id, start_time) finds each row's request.
+        booked = {(row.venue_id, row.start_time): row.id for row in inserted}
+        ids = [booked[row["venue_id"], row["start_time"]] for row in values]
+        # A bulk insert skips the mapper events that keep the counters.
+        counters.refresh(Venue, {row["venue_id"] for row in values})
+        counters.refresh(Artist, {row["artist_id"] for row in values})
+        db.session.commit()
+    except exc.IntegrityError as error:
+        db.session.rollback()
+        if getattr(error.orig, "pgcode", None) != EXCLUSION_VIOLATION:
+            raise
+        # A concurrent booking won the race between the checks and the
+        # insert, and the exclusion constraints turned this batch away.
+        return [], [{"index": None, "errors": {"shows": "booked meanwhile, retry"}}]
+    return ids, []
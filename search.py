@@ -0,0 +1,70 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import re
+
+from sqlalchemy import func, or_
+
+from models import db, Venue, Artist
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+# ----------------------------------------------------------------------------#
+# Postgres.
+# ----------------------------------------------------------------------------#
+
+
+def _postgres_search(model, term, limit, offset):
+    # Matches prefixes of every search token against the weighted
+    # name/city/state/genres tsvector, or the raw term anywhere in the name
+    # (served by the trigram index), ranked by the combination of both.
+    tokens = tokenize(term)
+    pattern = re.sub(r"([/%_])", r"/\1", term)
+    conditions = [model.name.ilike(f"%{pattern}%", escape="/")]
+    rank = func.similarity(model.name, term)
+    if tokens:
+        tsquery = func.to_tsquery("simple", " & ".join(t + ":*" for t in tokens))
+        conditions.append(model.search_vector.op("@@")(tsquery))
+        rank = rank + func.ts_rank(model.search_vector, tsquery)
+
+    query = db.session.query(model.id, model.name).filter(or_(*conditions))
+    rows = (
+        query.add_columns(func.count().over().label("total"))
+        .order_by(rank.desc(), model.name, model.id)
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+    if rows:
+        total = rows[0].total
+    else:
+        total = query.count() if offset else 0
+    return total, [{"id": row.id, "name": row.name} for row in rows]
+
+
+# ----------------------------------------------------------------------------#
+# Search.
+# ----------------------------------------------------------------------------#
+
+
+def _search(model, term, limit, offset):
+    total, data = _postgres_search(model, term, limit, offset)
+    return {
+        "count": total,
+        "data": data,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "prev_offset": max(offset - limit, 0) if offset else None,
+    }
+
+
+def search_venues(term, limit, offset=0):
+    return _search(Venue, term, limit, offset)
+
+
+def search_artists(term, limit, offset=0):
+    return _search(Artist, term, limit, offset)
@@ -2,3 +2,35 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Name typeahead for id fields: an <input data-autocomplete="<api url>"
+// data-target="<id field>" list="<datalist>"> suggests names as you type
+// and copies the id of the chosen one into the target field.
+Array.prototype.forEach.call(document.querySelectorAll('input[data-autocomplete]'), function (input) {
+  var list = document.getElementById(input.getAttribute('list'));
+  var target = document.getElementById(input.dataset.target);
+  var ids = {};
+  var pending = null;
+
+  input.addEventListener('input', function () {
+    if (ids[input.value] !== undefined) {
+      target.value = ids[input.value];
+      return;
+    }
+    clearTimeout(pending);
+    pending = setTimeout(function () {
+      fetch(input.dataset.autocomplete + '?q=' + encodeURIComponent(input.value))
+        .then(function (response) { return response.json(); })
+        .then(function (payload) {
+          ids = {};
+          list.innerHTML = '';
+          payload.data.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = item.name + ' (#' + item.id + ')';
+            ids[option.value] = item.id;
+            list.appendChild(option);
+          });
+        });
+    }, 100);
+  });
+});
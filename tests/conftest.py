@@ -0,0 +1,152 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The tests run against a PostgreSQL database they are free to wipe, with
+# the pg_trgm and btree_gist extensions available, e.g.
+#   TEST_DATABASE_URL=postgresql://localhost/fyyur_test python -m pytest
+# Without it every test that needs the database is skipped.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+TABLES = ("shows", "venues", "artists", "show_changes")
+
+# ----------------------------------------------------------------------------#
+# App and database.
+# ----------------------------------------------------------------------------#
+
+
+@pytest.fixture(scope="session")
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    import flask_migrate
+    from app import app
+    from models import db
+
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.session.execute(text("DROP SCHEMA public CASCADE"))
+        db.session.execute(text("CREATE SCHEMA public"))
+        db.session.commit()
+        flask_migrate.upgrade(directory=os.path.join(ROOT, "migrations"))
+    return app
+
+
+@pytest.fixture
+def database(app):
+    # An app context over empty tables and empty caches.
+    import autocomplete
+    from models import db
+
+    with app.app_context():
+        db.session.execute(
+            text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        )
+        db.session.commit()
+        app.extensions["page_cache"].clear()
+        app.jinja_env.fragment_cache.clear()
+        for index in autocomplete._indexes.values():
+            index.__init__(index.model)
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app, database):
+    from app import http_caching
+
+    http_caching.response_cache.clear()
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    # The SQL statements run on the primary while the test runs.
+    from models import db
+
+    with app.app_context():
+        engine = db.engine
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+# ----------------------------------------------------------------------------#
+# Rows.
+# ----------------------------------------------------------------------------#
+
+
+@pytest.fixture
+def add_venue(database):
+    from models import Venue
+
+    def add(name="The Musical Hop", city="San Francisco", state="CA", **values):
+        venue = Venue(
+            name=name,
+            city=city,
+            state=state,
+            address=values.pop("address", "1015 Folsom Street"),
+            phone=values.pop("phone", "123-123-1234"),
+            genres=values.pop("genres", ["Jazz"]),
+            **values,
+        )
+        database.session.add(venue)
+        database.session.commit()
+        return venue
+
+    return add
+
+
+@pytest.fixture
+def add_artist(database):
+    from models import Artist
+
+    def add(name="Guns N Petals", city="San Francisco", state="CA", **values):
+        artist = Artist(
+            name=name,
+            city=city,
+            state=state,
+            phone=values.pop("phone", "326-123-5000"),
+            genres=values.pop("genres", ["Rock n Roll"]),
+            **values,
+        )
+        database.session.add(artist)
+        database.session.commit()
+        return artist
+
+    return add
+
+
+@pytest.fixture
+def add_show(database):
+    import clock
+    from models import Show
+
+    def add(venue, artist, days=7):
+        show = Show(
+            venue_id=venue.id,
+            artist_id=artist.id,
+            start_time=clock.now() + timedelta(days=days),
+        )
+        database.session.add(show)
+        database.session.commit()
+        return show
+
+    return add
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from models import Show
+
+
+def test_conditional_get_revalidates_by_etag_only(
+    client, database, add_venue, add_artist, add_show
+):
+    venue = add_venue()
+    show = add_show(venue, add_artist())
+    url = f"/api/v1/venues/{venue.id}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.last_modified is None
+    etag = response.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # A delete changes the page without moving any updated_at; a client
+    # revalidating by date would be told its stale copy is current.
+    database.session.delete(database.session.get(Show, show.id))
+    database.session.commit()
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).strftime(
+        "%a, %d %b %Y %H:%M:%S GMT"
+    )
+    assert client.get(url, headers={"If-Modified-Since": tomorrow}).status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["upcoming_shows_count"] == 0
+
+
+def test_listing_etag_follows_the_page(client, database, add_venue):
+    add_venue("A Venue")
+    venue = add_venue("B Venue")
+    url = "/api/v1/venues?per_page=1"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # A row past the page leaves it alone; a row on it changes it.
+    venue.phone = "555-0199"
+    database.session.commit()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    add_venue("0 Venue")
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["areas"][0]["venues"][0]["name"] == "0 Venue"
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import pytest
+
+import areas
+import clock
+import jobs
+
+
+@pytest.fixture
+def precomputed(app, monkeypatch):
+    monkeypatch.setitem(app.config, "VENUE_AREAS_MODE", "precomputed")
+
+
+def upcoming(response):
+    return {
+        venue["name"]: venue["num_upcoming_shows"]
+        for area in response.json["areas"]
+        for venue in area["venues"]
+    }
+
+
+def test_precomputed_directory_follows_venue_writes_at_once(
+    client, precomputed, add_venue
+):
+    add_venue("The Musical Hop")
+    dueling = add_venue("The Dueling Pianos Bar").id
+    areas.refresh()
+    assert upcoming(client.get("/api/v1/venues")) == {
+        "The Musical Hop": 0,
+        "The Dueling Pianos Bar": 0,
+    }
+
+    assert client.get(f"/venues/{dueling}/delete").status_code == 200
+    assert upcoming(client.get("/api/v1/venues")) == {"The Musical Hop": 0}
+
+
+def test_precomputed_directory_catches_up_with_show_writes_on_refresh(
+    app, client, precomputed, add_venue, add_artist, statements
+):
+    venue_id = add_venue().id
+    artist_id = add_artist().id
+    areas.refresh()
+    response = client.get("/api/v1/venues")
+    assert upcoming(response) == {"The Musical Hop": 0}
+    etag = response.headers["ETag"]
+
+    start = clock.now().replace(microsecond=0) + timedelta(days=3)
+    show = {"venue_id": venue_id, "artist_id": artist_id}
+    statements.clear()
+    response = client.post(
+        "/api/v1/shows/batch",
+        json={"shows": [dict(show, start_time=start.isoformat())]},
+    )
+    assert response.status_code == 201
+    start += timedelta(days=1)
+    response = client.post(
+        "/shows/create",
+        data=dict(show, start_time=start.strftime("%Y-%m-%d %H:%M:%S")),
+    )
+    assert b"Show was successfully listed!" in response.data
+    assert not any("REFRESH" in statement for statement in statements)
+
+    jobs.run_job(app, "refresh-venue-areas")
+    response = client.get("/api/v1/venues", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert upcoming(response) == {"The Musical Hop": 2}
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("asgiref")
+
+from app import http_caching  # noqa: E402
+
+
+def asgi_get(path, headers=()):
+    # Runs one GET through asgi.application; returns (status, headers, body).
+    import asgi
+
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        try:
+            await asgi.application(scope, receive, send)
+        finally:
+            await asgi.engine.dispose()
+
+    asyncio.run(run())
+    start, body = messages
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers, body["body"]
+
+
+def test_detail_pages_send_the_wsgi_headers(client, add_venue, add_artist, add_show):
+    venue = add_venue()
+    artist = add_artist()
+    add_show(venue, artist)
+
+    for path in (f"/venues/{venue.id}", f"/artists/{artist.id}"):
+        http_caching.response_cache.clear()
+        expected = client.get(path)
+        http_caching.response_cache.clear()
+        status, headers, _ = asgi_get(path)
+        assert status == expected.status_code == 200
+        assert headers["cache-control"] == expected.headers["Cache-Control"]
+        assert headers["content-type"] == expected.headers["Content-Type"]
+
+        # The ASGI response went into the shared response cache too.
+        hits = http_caching.response_cache.hits
+        client.get(path)
+        assert http_caching.response_cache.hits == hits + 1
+
+
+def test_repeated_cookie_headers_stay_separate_cookies():
+    import asgi
+
+    environ = asgi._environ(
+        {
+            "method": "GET",
+            "path": "/",
+            "query_string": b"",
+            "http_version": "1.1",
+            "headers": [
+                (b"cookie", b"session=abc"),
+                (b"cookie", b"theme=dark"),
+                (b"accept", b"text/html"),
+                (b"accept", b"*/*"),
+            ],
+        }
+    )
+    assert environ["HTTP_COOKIE"] == "session=abc; theme=dark"
+    assert environ["HTTP_ACCEPT"] == "text/html,*/*"
@@ -0,0 +1,31 @@
+import autocomplete
+from models import Venue
+
+
+def names(response):
+    return [venue["name"] for venue in response.json["data"]]
+
+
+def test_suggestions_come_from_sql_by_default(client, statements, add_venue):
+    add_venue("The Musical Hop")
+    add_venue("the dueling pianos bar")
+    add_venue("Park Square Live Music & Coffee")
+    statements.clear()
+
+    response = client.get("/api/v1/venues/autocomplete?q=THE")
+    assert names(response) == ["the dueling pianos bar", "The Musical Hop"]
+    assert any("LIKE" in statement for statement in statements)
+    assert autocomplete._indexes[Venue].loaded_at is None
+
+
+def test_index_answers_like_sql(app, client, statements, add_venue, monkeypatch):
+    add_venue("The Musical Hop")
+    add_venue("the dueling pianos bar")
+    monkeypatch.setitem(app.config, "AUTOCOMPLETE_INDEX", True)
+    autocomplete._indexes[Venue].load()
+    add_venue("The Fillmore")
+    statements.clear()
+
+    response = client.get("/api/v1/venues/autocomplete?q=the&limit=2")
+    assert names(response) == ["the dueling pianos bar", "The Fillmore"]
+    assert not any("LIKE" in statement for statement in statements)
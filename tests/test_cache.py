@@ -0,0 +1,56 @@
+import importlib
+import sys
+
+import pytest
+
+from cache import FragmentCache, LRUBackend, NullBackend, PageCache
+
+
+@pytest.fixture
+def load_config(monkeypatch):
+    # config.py as a process started with `env` would read it.
+    def load(**env):
+        for name in (
+            "FYYUR_PROFILE",
+            "PAGE_CACHE_BACKEND",
+            "FRAGMENT_CACHE_BACKEND",
+            "PAGE_CACHE_REDIS_URL",
+        ):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        monkeypatch.delitem(sys.modules, "config", raising=False)
+        return importlib.import_module("config")
+
+    return load
+
+
+def test_prod_does_not_keep_caches_per_process(load_config):
+    config = load_config(FYYUR_PROFILE="prod")
+    assert config.PAGE_CACHE_BACKEND == "none"
+    assert config.FRAGMENT_CACHE_BACKEND == "none"
+
+    config = load_config(
+        FYYUR_PROFILE="prod", PAGE_CACHE_REDIS_URL="redis://cache:6379/0"
+    )
+    assert config.PAGE_CACHE_BACKEND == "redis"
+    assert config.FRAGMENT_CACHE_BACKEND == "redis"
+
+    config = load_config()
+    assert config.PAGE_CACHE_BACKEND == "lru"
+
+
+def test_disabled_page_cache_always_loads():
+    page_cache = PageCache.from_config({"PAGE_CACHE_BACKEND": "none"})
+    loads = []
+
+    def loader(venue_id):
+        loads.append(venue_id)
+        return {"id": venue_id}
+
+    assert page_cache.get_or_load("venue", 1, loader) == {"id": 1}
+    assert page_cache.get_or_load("venue", 1, loader) == {"id": 1}
+    assert loads == [1, 1]
+    assert isinstance(PageCache.from_config({}).backend, LRUBackend)
+    fragments = FragmentCache.from_config({"FRAGMENT_CACHE_BACKEND": "none"})
+    assert isinstance(fragments.backend, NullBackend)
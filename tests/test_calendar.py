@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "start=next+friday",
+        "start=2030-13-01",
+        "end=2030-02-30T20:00",
+        "start=2030-01-01T00:00:00%2B99:00",
+        "start=9999-12-31",
+        "start=2030-02-01&end=2030-01-01",
+        "venue_id=99999999999",
+        "artist_id=-2147483649",
+        "venue_id=abc",
+        "city=New%00York",
+    ],
+)
+@pytest.mark.parametrize("path", ["/api/v1/calendar", "/api/v1/calendar.ics"])
+def test_bad_ranges_are_rejected(client, path, query):
+    assert client.get(f"{path}?{query}").status_code == 400
+
+
+def test_iso_ranges_are_read(client, add_venue, add_artist, add_show):
+    show = add_show(add_venue(), add_artist(), days=40)
+    start = show.start_time.date()
+    response = client.get(f"/api/v1/calendar?start={start}&end={start}T23:59:59")
+    assert response.status_code == 200
+    assert [entry["id"] for entry in response.json["shows"]] == [show.id]
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import text
+
+import exporter
+from conftest import ROOT, TABLES, TEST_DATABASE_URL
+
+# Runs an export in a fresh interpreter and prints the size of the output
+# and how much the peak RSS (KiB on Linux) grew while producing it.
+EXPORT = """
+import resource, sys
+from app import app
+import exporter
+with app.app_context():
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    size = sum(len(chunk) for chunk in exporter.export_rows(*sys.argv[1:]))
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(size, after - before)
+"""
+
+
+def seed_venues(database, count):
+    database.session.execute(
+        text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+    )
+    database.session.execute(
+        text("""
+            INSERT INTO venues (name, city, state, address, phone, genres,
+                                website, seeking_talent, seeking_description,
+                                updated_at)
+            SELECT 'Venue ' || i, 'City ' || i % 500, 'NY', i || ' Main St',
+                   '555-0100', ARRAY[1 + i % 19]::smallint[],
+                   'https://example.com/venues/' || i, false, repeat('x', 100), now()
+            FROM generate_series(1, :count) AS i
+            """),
+        {"count": count},
+    )
+    database.session.commit()
+
+
+def peak_growth(kind, format):
+    env = dict(os.environ, DATABASE_URL=TEST_DATABASE_URL, FYYUR_PROFILE="prod")
+    result = subprocess.run(
+        [sys.executable, "-c", EXPORT, kind, format],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    size, growth = result.stdout.split()[-2:]
+    return int(size), int(growth)
+
+
+@pytest.mark.parametrize("format", sorted(exporter.FORMATS))
+def test_export_memory_does_not_grow_with_rows(database, format):
+    seed_venues(database, 5000)
+    small_size, small_growth = peak_growth("venues", format)
+    seed_venues(database, 100000)
+    large_size, large_growth = peak_growth("venues", format)
+
+    assert large_size > 15 * small_size
+    # Twenty times the rows; holding them would take over 100 MiB.
+    assert large_growth < small_growth + 16 * 1024
+
+
+def test_export_csv_round_trips_through_the_import_columns(add_venue):
+    add_venue("The Musical Hop", genres=["Jazz", "Folk"], seeking_talent=True)
+    lines = "".join(exporter.export_rows("venues", "csv")).splitlines()
+    assert lines[0].split(",")[:3] == ["id", "name", "city"]
+    assert "website_link" in lines[0]
+    assert lines[1].startswith("1,The Musical Hop,San Francisco,CA,")
+    assert '"Jazz,Folk"' in lines[1] and lines[1].endswith(",true,")
@@ -0,0 +1,95 @@
+import io
+import json
+from datetime import timedelta
+
+import pytest
+
+import clock
+import importer
+from models import Show
+
+
+def show_rows(venue, artist, *hours):
+    # (line number, row) pairs for shows starting `hours` after a day from
+    # now, numbered from line 2 as in a CSV file with a header.
+    start = clock.now().replace(tzinfo=None, microsecond=0) + timedelta(days=1)
+    return [
+        (
+            line_no,
+            {
+                "venue_id": venue.id,
+                "artist_id": artist.id,
+                "start_time": (start + timedelta(hours=h)).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                ),
+            },
+        )
+        for line_no, h in enumerate(hours, start=2)
+    ]
+
+
+@pytest.mark.parametrize("use_copy", [False, True])
+def test_double_bookings_are_rejected_by_line(
+    database, add_venue, add_artist, use_copy
+):
+    venue, artist = add_venue(), add_artist()
+    rows = show_rows(venue, artist, 0, 1, 5, 6, 10)
+
+    loaded, errors, _ = importer.import_rows(
+        "shows", iter(rows), batch_size=3, use_copy=use_copy
+    )
+
+    assert loaded == 3
+    assert errors == [
+        (3, "venue_id - venue is booked by line 2"),
+        (5, "venue_id - venue is booked by show 2"),
+    ]
+    assert database.session.query(Show).count() == 3
+
+
+def test_shows_booked_meanwhile_reject_their_batch(
+    database, add_venue, add_artist, monkeypatch
+):
+    # Another writer books the slot between the checks and the insert.
+    venue, artist = add_venue(), add_artist()
+    importer.import_rows("shows", iter(show_rows(venue, artist, 0)))
+    monkeypatch.setattr(importer, "_check_show_bookings", lambda batch, errors: batch)
+
+    loaded, errors, _ = importer.import_rows(
+        "shows", iter(show_rows(venue, artist, 1, 5)), batch_size=1
+    )
+
+    assert loaded == 1
+    assert errors == [(2, "shows - booked meanwhile")]
+
+
+def test_lines_that_are_not_objects_are_rejected_by_line(database):
+    artist = {
+        "city": "Austin",
+        "state": "TX",
+        "phone": "512-555-0100",
+        "genres": ["Folk"],
+        "facebook_link": "https://www.facebook.com/band",
+        "website_link": "https://band.example.com",
+    }
+    source = io.StringIO(
+        "\n".join(
+            [
+                json.dumps(dict(artist, name="Band 1")),
+                "{not json",
+                json.dumps(["Band 2", "Austin"]),
+                "",
+                json.dumps(dict(artist, name="Band 3")),
+            ]
+        )
+    )
+
+    loaded, errors, _ = importer.import_rows(
+        "artists", importer.read_rows(source, "ndjson")
+    )
+
+    assert loaded == 2
+    assert errors == [
+        (2, "row - must be a JSON object"),
+        (3, "row - must be a JSON object"),
+    ]
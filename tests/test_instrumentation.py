@@ -0,0 +1,21 @@
+import pytest
+from flask import g
+from sqlalchemy import exc, text
+
+from instrumentation import RequestStats
+
+
+def test_failed_statements_leave_no_timing_behind(app, database):
+    with app.test_request_context():
+        g.request_stats = stats = RequestStats(3)
+        connection = database.session.connection()
+        for _ in range(3):
+            with pytest.raises(exc.DataError):
+                database.session.execute(text("SELECT 1 / 0"))
+            database.session.rollback()
+            connection = database.session.connection()
+        database.session.execute(text("SELECT pg_sleep(0.05)"))
+
+        assert stats.query_count == 1
+        assert stats.db_time >= 0.05
+        assert "query_started" not in connection.connection.info
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+import pytest
+
+import clock
+import jobs
+from models import Venue
+
+
+class Stop(Exception):
+    pass
+
+
+def test_jobs_run_at_start_and_then_on_their_intervals(app, monkeypatch):
+    runs = []
+    monkeypatch.setattr(jobs, "run_job", lambda app, name: runs.append((now, name)))
+    monkeypatch.setitem(
+        app.config,
+        "JOB_INTERVALS",
+        {"roll-over-shows": 300, "refresh-venue-areas": 900, "prune-show-changes": 1e9},
+    )
+    now = 0
+
+    def sleep(seconds):
+        nonlocal now
+        now += seconds
+        if now > 1000:
+            raise Stop
+
+    with pytest.raises(Stop):
+        jobs.run_forever(app, clock=lambda: now, sleep=sleep)
+    assert runs == [
+        (0, "roll-over-shows"),
+        (0, "refresh-venue-areas"),
+        (0, "prune-show-changes"),
+        (300, "roll-over-shows"),
+        (600, "roll-over-shows"),
+        (900, "roll-over-shows"),
+        (900, "refresh-venue-areas"),
+    ]
+
+
+def test_roll_over_job_moves_started_shows_to_past(
+    app, database, add_venue, add_artist, add_show
+):
+    venue = add_venue()
+    show = add_show(venue, add_artist())
+    show.start_time = clock.now() - timedelta(hours=4)
+    show.end_time = show.start_time + timedelta(hours=3)
+    database.session.commit()
+    database.session.execute(
+        Venue.__table__.update().values(
+            upcoming_shows_count=1, past_shows_count=0, next_show_at=show.start_time
+        )
+    )
+    database.session.commit()
+
+    venue_id = venue.id
+    jobs.run_job(app, "roll-over-shows")
+    venue = database.session.get(Venue, venue_id)
+    assert (venue.upcoming_shows_count, venue.past_shows_count) == (0, 1)
@@ -0,0 +1,50 @@
+import pytest
+
+from app import http_caching
+from queries import encode_cursor
+
+
+def get_venues(client, statements):
+    # Misses the shared response cache so the view runs its queries.
+    http_caching.response_cache.clear()
+    statements.clear()
+    response = client.get("/venues")
+    assert response.status_code == 200
+    return response
+
+
+def test_venues_query_count_does_not_grow_with_rows(
+    client, statements, add_venue, add_artist, add_show
+):
+    artist = add_artist()
+    add_show(add_venue(), artist)
+    get_venues(client, statements)
+    assert len(statements) == 1
+
+    for i in range(10):
+        venue = add_venue(f"Venue {i}", city=f"City {i % 4}", state="NY")
+        add_show(venue, artist, days=i + 10)
+    response = get_venues(client, statements)
+    assert b"Venue 9" in response.data
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize(
+    "path, key",
+    [
+        ("/venues", ["NY", "New York", "Hop", "1"]),
+        ("/venues", ["NY", "New York", "Hop"]),
+        ("/venues", ["NY", "New York", "Hop", 2**31]),
+        ("/venues", ["NY", "New\x00York", "Hop", 1]),
+        ("/artists", [123, 4]),
+        ("/artists", ["Band", True]),
+        ("/shows", [123, 4]),
+        ("/shows", ["next friday", 4]),
+        ("/api/v1/venues", [None, "New York", "Hop", 1]),
+        ("/api/v1/shows", [[2030], 4]),
+    ],
+)
+def test_well_formed_cursors_with_wrong_values_are_rejected(client, path, key):
+    for direction in ("after", "before"):
+        response = client.get(f"{path}?{direction}={encode_cursor(key)}")
+        assert response.status_code == 400, (direction, key)
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+from sqlalchemy import event, text
+
+from app import http_caching
+from conftest import TABLES
+from models import db
+from queries import encode_cursor
+
+ROWS = 50000
+SHOWS = 60000
+SHOWS_PER_DAY = 100
+
+# Names are "<word> <word> <n>", so a two-word search matches one name in 64.
+WORDS = "(ARRAY['Blue', 'Red', 'Golden', 'Silver', 'Velvet', 'Iron', 'Neon', 'Cellar'])"
+
+# ROWS venues and artists, and SHOWS shows at SHOWS_PER_DAY a day from 200
+# days ago. A venue or artist is booked at most once every
+# ROWS / SHOWS_PER_DAY days, so no two shows overlap.
+SEED = [
+    f"""
+    INSERT INTO venues (name, city, state, address, phone, genres,
+                        seeking_talent, updated_at)
+    SELECT {WORDS}[1 + i % 8] || ' ' || {WORDS}[1 + i / 8 % 8] || ' ' || i,
+           'City ' || i % 500, 'S' || i % 50, i || ' Main St', '555-0100',
+           ARRAY[1 + i % 19, 1 + i * 7 % 19]::smallint[], i % 3 = 0, now()
+    FROM generate_series(1, {ROWS}) AS i
+    """,
+    f"""
+    INSERT INTO artists (name, city, state, phone, genres, seeking_venue,
+                         updated_at)
+    SELECT {WORDS}[1 + i / 8 % 8] || ' ' || {WORDS}[1 + i % 8] || ' ' || i,
+           'City ' || i % 500, 'S' || i % 50, '555-0100',
+           ARRAY[1 + i % 19]::smallint[], i % 4 = 0, now()
+    FROM generate_series(1, {ROWS}) AS i
+    """,
+    f"""
+    INSERT INTO shows (venue_id, artist_id, start_time, end_time, updated_at)
+    SELECT 1 + i % {ROWS}, 1 + i * 7919 % {ROWS}, day, day + interval '3 hours',
+           now()
+    FROM generate_series(0, {SHOWS - 1}) AS i,
+         LATERAL (
+             SELECT now() + (i / {SHOWS_PER_DAY} - 200) * interval '1 day' AS day
+         ) AS d
+    """,
+]
+
+# Read paths that must stay index-backed as the tables grow. The calendar
+# without filters is left out: a month of every venue's shows is a bulk
+# read, for which hashing the venues and artists is a fair plan.
+URLS = [
+    "/venues",
+    "/venues?after=" + encode_cursor(["S25", "City 25", "Iron Silver 25", 25]),
+    "/venues/123",
+    "/venues/search?search_term=Velvet Cellar",
+    "/artists",
+    "/artists/123",
+    "/artists/search?search_term=Neon Iron",
+    "/artists?after=" + encode_cursor(["Iron Blue 5000", 5000]),
+    "/shows",
+    "/api/v1/venues",
+    "/api/v1/venues/123",
+    "/api/v1/venues/autocomplete?q=velvet ce",
+    "/api/v1/artists",
+    "/api/v1/artists/123",
+    "/api/v1/artists/autocomplete?q=neon b",
+    "/api/v1/shows",
+    "/api/v1/calendar?venue_id=123",
+    "/api/v1/calendar?artist_id=123",
+]
+
+
+@pytest.fixture(scope="module")
+def seeded(app):
+    with app.app_context():
+        db.session.execute(
+            text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        )
+        db.session.execute(text("SET LOCAL statement_timeout = 0"))
+        for statement in SEED:
+            db.session.execute(text(statement))
+        db.session.commit()
+        # As autovacuum would: sets the visibility map, flushes the GIN
+        # pending lists and gathers statistics.
+        with db.engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(
+                text("VACUUM ANALYZE")
+            )
+    yield app
+    with app.app_context():
+        db.session.execute(
+            text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        )
+        db.session.commit()
+
+
+def seq_scans(plan):
+    # Relations read by a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan.
+    found = []
+    if plan["Node Type"] == "Seq Scan" and plan["Relation Name"] in TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found += seq_scans(child)
+    return found
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_read_path_does_not_scan_a_whole_table(seeded, monkeypatch, url):
+    # Plans every SELECT the view runs with the parameters it ran with.
+    # Prepared statements and the in-process indexes are turned off so the
+    # statements reach the database as plain SQL.
+    monkeypatch.setitem(seeded.config, "DB_PREPARED_STATEMENTS", False)
+    monkeypatch.setitem(seeded.config, "AUTOCOMPLETE_INDEX", False)
+    seeded.extensions["page_cache"].clear()
+    http_caching.response_cache.clear()
+    with seeded.app_context():
+        engine = db.engine
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = seeded.test_client().get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert executed
+
+    with seeded.app_context(), db.engine.connect() as connection:
+        for statement, parameters in executed:
+            plan = connection.exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + statement, parameters
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            assert seq_scans(plan[0]["Plan"]) == [], statement
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+from flask_sqlalchemy import get_state
+from sqlalchemy import event
+
+import clock
+from app import http_caching
+from conftest import TEST_DATABASE_URL
+
+
+@pytest.fixture
+def replica(app, database, monkeypatch):
+    # A second engine on the test database standing in for a read replica;
+    # yields the statements run on it.
+    monkeypatch.setitem(app.config, "SQLALCHEMY_REPLICA_URIS", [TEST_DATABASE_URL])
+    state = get_state(app)
+    state.replicas = None
+    (engine,), _ = database.replica_engines(app)
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+    engine.dispose()
+    state.replicas = None
+
+
+def test_detail_page_cache_is_filled_from_the_primary(
+    client, replica, statements, add_venue, add_artist, add_show
+):
+    venue = add_venue()
+    add_show(venue, add_artist())
+    statements.clear()
+
+    assert client.get("/venues").status_code == 200
+    assert replica and not statements
+
+    http_caching.response_cache.clear()
+    replica.clear()
+    assert client.get(f"/venues/{venue.id}").status_code == 200
+    assert statements and not replica
+
+
+def test_scheduling_a_show_keeps_the_client_on_the_primary(
+    client, replica, statements, add_venue, add_artist
+):
+    venue_id = add_venue().id
+    artist_id = add_artist().id
+    start = clock.now().replace(microsecond=0) + timedelta(days=3)
+    response = client.post(
+        "/api/v1/shows/batch",
+        json={
+            "shows": [
+                {
+                    "venue_id": venue_id,
+                    "artist_id": artist_id,
+                    "start_time": start.isoformat(),
+                }
+            ]
+        },
+    )
+    assert response.status_code == 201
+
+    statements.clear()
+    replica.clear()
+    assert client.get("/api/v1/shows").status_code == 200
+    assert statements and not replica
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import clock
+import scheduling
+from models import Show
+
+
+def test_parse_show_reads_iso_times():
+    values, errors = scheduling.parse_show(
+        {"venue_id": 1, "artist_id": 2, "start_time": "2030-05-01T20:00:00+00:00"}
+    )
+    assert errors == {}
+    assert values["start_time"] == datetime(2030, 5, 1, 20, tzinfo=timezone.utc)
+    assert values["end_time"] > values["start_time"]
+
+    values, errors = scheduling.parse_show(
+        {"venue_id": 1, "artist_id": 2, "start_time": "tomorrow night"}
+    )
+    assert errors == {"start_time": "must be an ISO 8601 date and time"}
+
+
+def test_ids_out_of_range_are_field_errors(client):
+    response = client.post(
+        "/api/v1/shows/batch",
+        json={
+            "shows": [
+                {
+                    "venue_id": 2**31,
+                    "artist_id": -(2**31) - 1,
+                    "start_time": "2030-05-01T20:00:00",
+                }
+            ]
+        },
+    )
+    assert response.status_code == 422
+    assert response.json["errors"] == [
+        {
+            "index": 0,
+            "errors": {
+                "venue_id": "must be an integer",
+                "artist_id": "must be an integer",
+            },
+        }
+    ]
+
+
+def test_batch_ids_follow_the_request_order(client, add_venue, add_artist):
+    venues = [add_venue(f"Venue {i}").id for i in range(3)]
+    artists = [add_artist(f"Artist {i}").id for i in range(3)]
+    start = clock.now().replace(microsecond=0) + timedelta(days=3)
+    items = [
+        {
+            "venue_id": venue_id,
+            "artist_id": artist_id,
+            "start_time": (start + timedelta(days=days)).isoformat(),
+        }
+        for venue_id, artist_id, days in zip(reversed(venues), artists, [5, 0, 2])
+    ]
+
+    response = client.post("/api/v1/shows/batch", json={"shows": items})
+    assert response.status_code == 201
+    for show_id, item in zip(response.json["ids"], items):
+        show = Show.query.get(show_id)
+        assert (show.venue_id, show.artist_id) == (item["venue_id"], item["artist_id"])
+        assert show.start_time.isoformat() == item["start_time"]
@@ -0,0 +1,39 @@
+import search
+
+
+def test_search_matches_name_place_and_genre_prefixes(add_venue):
+    hop = add_venue("The Musical Hop", city="San Francisco", genres=["Jazz"])
+    add_venue(
+        "Park Square Live Music & Coffee", city="New York", state="NY", genres=["Folk"]
+    )
+
+    for term in ("musical hop", "Hop", "san fran", "jazz"):
+        result = search.search_venues(term, 10)
+        assert [venue["id"] for venue in result["data"]] == [hop.id], term
+        assert result["count"] == 1
+
+
+def test_search_pages_through_results(add_artist):
+    for i in range(5):
+        add_artist(f"Band {i}")
+
+    first = search.search_artists("band", 2)
+    assert first["count"] == 5
+    assert first["next_offset"] == 2 and first["prev_offset"] is None
+    last = search.search_artists("band", 2, offset=4)
+    assert len(last["data"]) == 1
+    assert last["next_offset"] is None and last["prev_offset"] == 2
+
+
+def test_like_wildcards_in_the_term_match_literally(add_venue):
+    add_venue("The Musical Hop")
+    percent = add_venue("100% Jazz")
+    underscore = add_venue("Under_score")
+
+    assert search.search_venues("_", 10)["data"] == [
+        {"id": underscore.id, "name": "Under_score"}
+    ]
+    assert [venue["id"] for venue in search.search_venues("%", 10)["data"]] == [
+        percent.id
+    ]
+    assert search.search_venues("/", 10)["count"] == 0
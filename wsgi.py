@@ -0,0 +1,24 @@
+# ----------------------------------------------------------------------------#
+# Imports
+# ----------------------------------------------------------------------------#
+import os
+
+# Production entry point: `gunicorn wsgi:app`, tuned by gunicorn.conf.py.
+os.environ.setdefault("FYYUR_PROFILE", "prod")
+
+from app import app
+from models import db
+
+# ----------------------------------------------------------------------------#
+# Forking.
+# ----------------------------------------------------------------------------#
+
+
+def dispose_engines():
+    # Called in each worker right after the fork. The pools copied from the
+    # preloaded parent are dropped without closing their connections
+    # (close=False), which would also close them for the parent; the worker
+    # then opens its own.
+    with app.app_context():
+        db.engine.dispose(close=False)
+        db.dispose_replicas(app, close=False)